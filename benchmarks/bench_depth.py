@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+"""Compare DepthOrder with a full sorted() of every sprite each frame
+
+Run from the repository root: python benchmarks/bench_depth.py
+"""
+
+import os
+import sys
+import random
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pygame
+from depth import DepthOrder
+
+SIZES = (1_000, 10_000, 50_000)
+DYNAMIC_RATIO = 0.05
+FRAMES = 60
+
+
+class FakeSprite:
+    __slots__ = ('rect',)
+
+    def __init__(self, x: int, y: int) -> None:
+        self.rect = pygame.Rect(x, y, 64, 64)
+
+
+def build(size: int, rng: random.Random):
+    dynamic_count = max(1, int(size * DYNAMIC_RATIO))
+    sprites = [FakeSprite(rng.randint(0, 100_000), rng.randint(0, 100_000))
+               for _ in range(size)]
+
+    return sprites[dynamic_count:], sprites[:dynamic_count]
+
+
+def move(dynamic, rng: random.Random):
+    """Half of the dynamic sprites move a few pixels, like a normal frame"""
+    for sprite in dynamic[::2]:
+        sprite.rect.y += rng.randint(-6, 6)
+
+
+def bench_sorted(static, dynamic, rng: random.Random) -> float:
+    sprites = static + dynamic
+    elapsed = 0
+
+    for _ in range(FRAMES):
+        move(dynamic, rng)
+
+        start = perf_counter()
+        for sprite in sorted(sprites, key=lambda sprite: sprite.rect.centery):
+            pass
+        elapsed += perf_counter() - start
+
+    return elapsed / FRAMES * 1000
+
+
+def bench_depth_order(static, dynamic, rng: random.Random) -> float:
+    depth_order = DepthOrder()
+
+    for sprite in static:
+        depth_order.add(sprite, static=True)
+    for sprite in dynamic:
+        depth_order.add(sprite, static=False)
+
+    elapsed = 0
+
+    for _ in range(FRAMES):
+        move(dynamic, rng)
+
+        start = perf_counter()
+        depth_order.refresh()
+        for sprite in depth_order.ordered():
+            pass
+        elapsed += perf_counter() - start
+
+    return elapsed / FRAMES * 1000
+
+
+def main():
+    print(f'{"sprites":>8} {"sorted() ms":>12} {"DepthOrder ms":>14} {"speedup":>8}')
+
+    for size in SIZES:
+        static, dynamic = build(size, random.Random(size))
+        sorted_ms = bench_sorted(static, dynamic, random.Random(1))
+
+        static, dynamic = build(size, random.Random(size))
+        depth_ms = bench_depth_order(static, dynamic, random.Random(1))
+
+        print(f'{size:>8} {sorted_ms:>12.3f} {depth_ms:>14.3f} {sorted_ms / depth_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+"""Compare loading every game image one at a time with the threaded preloader
+
+Run from the repository root: python benchmarks/bench_startup.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Optional
+
+import pygame
+from assets import AssetRegistry, image_manifest
+from settings import WIDTH, HEIGTH
+
+REPEATS = 5
+
+
+def bench_serial(manifest) -> float:
+    """Load like the game did before preloading: decode and convert one by one"""
+    registry = AssetRegistry()
+    start = perf_counter()
+
+    for path, alpha in manifest:
+        registry.image(path, alpha)
+
+    return (perf_counter() - start) * 1000
+
+
+def bench_preload(manifest, workers: Optional[int]) -> float:
+    registry = AssetRegistry()
+    start = perf_counter()
+
+    registry.preload(manifest, workers=workers)
+
+    return (perf_counter() - start) * 1000
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGTH))
+
+    manifest = image_manifest()
+
+    # Warm the OS file cache so the first mode isn't charged for disk reads
+    bench_serial(manifest)
+
+    print(f'{len(manifest)} images, best of {args.repeats} (cpu count {os.cpu_count()})')
+
+    serial_ms = min(bench_serial(manifest) for _ in range(args.repeats))
+    print(f'{"serial":>10} {serial_ms:>9.1f} ms')
+
+    default_ms = min(bench_preload(manifest, None) for _ in range(args.repeats))
+    print(f'{"default":>10} {default_ms:>9.1f} ms {serial_ms / default_ms:>6.2f}x')
+
+    for workers in args.workers:
+        preload_ms = min(bench_preload(manifest, workers)
+                         for _ in range(args.repeats))
+        print(f'{workers:>2} threads {preload_ms:>9.1f} ms {serial_ms / preload_ms:>6.2f}x')
+
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+#! /usr/bin/env python3
+"""Benchmark the per-frame hot paths on the real map scaled 1x, 10x and 100x
+
+Every phase is timed by wrapping the method on its class, the level is driven
+by the headless runner (fixed timestep, scripted input) and the results are
+compared against the last saved baseline. Each scale is run several times on a
+fresh level with the same frame count: the best run is reported, and the
+spread between runs sets how much a metric may grow before it counts as a
+regression.
+
+The map is streamed in by regions around the camera, so past create_map the
+per-frame workload hardly grows with the map: the loaded sprite counts stay
+about the same at every scale, and the scaled tiers mainly exercise loading
+(create_map) and region streaming. The map enemies and map tiles counts show
+the full size of each map.
+
+Run from the repository root:
+    python benchmarks/suite.py            # compare against benchmarks/baseline.json
+    python benchmarks/suite.py --save     # ... and store this run as the new baseline
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import gc
+import json
+import tracemalloc
+from argparse import ArgumentParser
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+from typing import *
+
+from headless import HeadlessRunner, patrol
+import pygame
+
+from enemy import Enemy, EnemyGroup
+from entity import Entity
+from level import Level, YSortCameraGroup
+from map_cache import MAP_SOURCES, MapData
+from sound import SoundManager
+from support import import_csv_layout
+from ui import UI
+
+SCALES = {1: (1, 1), 10: (5, 2), 100: (10, 10)}
+# Reported for context, not compared against the baseline
+COUNTS = ('map enemies', 'map tiles', 'loaded enemies', 'awake enemies', 'loaded sprites',
+          'loaded regions', 'weapons created', 'particles high water')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+# A metric regresses when it grows by more than NOISE_FACTOR times its run to
+# run spread (in the baseline or this run), and never less than MIN_THRESHOLD
+NOISE_FACTOR = 2.0
+MIN_THRESHOLD = 0.03
+
+# (class, method name, phase name), EnemyGroup.enemy_update is the whole AI
+# pass: waking, sensing, the flow field and every Enemy.enemy_update
+PHASES = (
+    (Level, 'create_map', 'Level.create_map'),
+    (YSortCameraGroup, 'custom_draw', 'YSortCameraGroup.custom_draw'),
+    (Entity, 'move', 'Entity.move'),
+    (Entity, 'collision', 'Entity.collision'),
+    (EnemyGroup, 'enemy_update', 'EnemyGroup.enemy_update'),
+    (Enemy, 'enemy_update', 'Enemy.enemy_update'),
+    (Level, 'player_attack_logic', 'Level.player_attack_logic'),
+    (UI, 'display', 'UI.display'),
+)
+
+
+def scaled_map(scale: int) -> MapData:
+    """Tile the map CSVs so the map holds `scale` times the tiles and enemies (one player only)"""
+    across, down = SCALES[scale]
+    layouts = {style: import_csv_layout(source)
+               for style, source in MAP_SOURCES.items()}
+
+    scaled = {}
+
+    for style, layout in layouts.items():
+        rows = [row * across for row in layout] * down
+        scaled[style] = [list(row) for row in rows]
+
+    # Keep the first player spawn, the copies become empty cells
+    player_found = False
+    for row in scaled['entities']:
+        for index, col in enumerate(row):
+            if col == '394':
+                if player_found:
+                    row[index] = '-1'
+                player_found = True
+
+    return MapData.from_layouts(scaled)
+
+
+def timer(method: Callable, phase: str, totals: Dict[str, float]) -> Callable:
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            totals[phase] += perf_counter() - start
+
+    return wrapper
+
+
+@contextmanager
+def timed_phases(totals: Dict[str, float]):
+    """Wrap every PHASES method so its time accumulates into totals"""
+    originals = []
+
+    for owner, name, phase in PHASES:
+        original = owner.__dict__[name]
+        originals.append((owner, name, original))
+        setattr(owner, name, timer(original, phase, totals))
+
+    try:
+        yield
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+@contextmanager
+def silenced():
+    """Stop and skip every sound effect
+
+    A sound finishing on SDL's audio thread while tracemalloc traces crashes
+    the interpreter, so the allocation pass runs without sound.
+    """
+    play = SoundManager.__dict__['play']
+    pygame.mixer.stop()
+    SoundManager.play = lambda self, *args, **kwargs: None
+
+    try:
+        yield
+    finally:
+        SoundManager.play = play
+
+
+def bench_run(map_data: MapData, frames: int) -> Tuple[HeadlessRunner, Dict[str, float]]:
+    """Build a fresh level, warm it up and time `frames` frames"""
+    totals: Dict[str, float] = defaultdict(float)
+
+    with timed_phases(totals):
+        runner = HeadlessRunner(patrol, level_factory=lambda: Level(map_data))
+        create_map_ms = totals['Level.create_map'] * 1000
+
+        # Warm up caches before measuring
+        runner.run(min(30, frames))
+        totals.clear()
+
+        frame_start = perf_counter()
+        for _ in range(frames):
+            runner.step()
+        frame_seconds = perf_counter() - frame_start
+
+    sample = {
+        'Level.run ms': frame_seconds / frames * 1000,
+        'Level.create_map ms': create_map_ms,
+    }
+
+    for _, __, phase in PHASES[1:]:
+        sample[f'{phase} ms'] = totals[phase] / frames * 1000
+
+    return runner, sample
+
+
+def bench_scale(scale: int, frames: int, alloc_frames: int, repeats: int) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Get the best of `repeats` runs of every metric, and each metric's relative spread between runs"""
+    map_data = scaled_map(scale)
+
+    # The first level also loads every image, only later builds are comparable
+    bench_run(map_data, 1)
+    samples = []
+
+    for _ in range(repeats):
+        runner, sample = bench_run(map_data, frames)
+        samples.append(sample)
+
+    best = {name: min(sample[name] for sample in samples) for name in samples[0]}
+    noise = {}
+
+    for name in samples[0]:
+        values = [sample[name] for sample in samples]
+        noise[name] = (max(values) - min(values)) / min(values) if min(values) else 0.0
+
+    noise['fps'] = noise['Level.run ms']
+
+    level = runner.level
+    loaded_enemies = len(level.enemy_sprites) + len(level.enemy_sprites.sleeping)
+    streaming = level.streamer.stats()
+
+    result = {
+        'map enemies': loaded_enemies + streaming['saved_enemies'],
+        'map tiles': sum(1 for style in ('grass', 'object') for _ in map_data.tiles(style)),
+        'loaded enemies': loaded_enemies,
+        'awake enemies': len(level.enemy_sprites),
+        'loaded sprites': len(level.visible_sprites) + len(level.obstacle_sprites),
+        'loaded regions': streaming['loaded'],
+        'fps': 1000 / best['Level.run ms'],
+        **best,
+        'weapons created': level.weapon_pool.created,
+        'particles high water': level.animation_player.particles.high_water,
+    }
+
+    # Allocations are measured in a separate pass, tracemalloc slows everything down
+    with silenced():
+        gc_before = sum(stat['collections'] for stat in gc.get_stats())
+        tracemalloc.start()
+        peak_total = 0
+
+        for _ in range(alloc_frames):
+            current, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            runner.step()
+            peak_total += tracemalloc.get_traced_memory()[1] - current
+
+        tracemalloc.stop()
+
+    gc_after = sum(stat['collections'] for stat in gc.get_stats())
+
+    result['alloc KB/frame'] = peak_total / alloc_frames / 1024
+    result['gc collections/frame'] = (gc_after - gc_before) / alloc_frames
+
+    return result, noise
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], noise: Dict[str, Dict[str, float]], baseline_noise: Dict[str, Dict[str, float]], threshold: Optional[float] = None) -> List[str]:
+    """List the metrics that got worse than the baseline by more than their noise allows
+
+    A fixed threshold (a ratio) replaces the noise based one when given.
+    """
+    regressions = []
+
+    for scale, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get(scale, {}).get(name)
+
+            if not old or name in COUNTS:
+                continue
+
+            if threshold is None:
+                spread = max(noise.get(scale, {}).get(name, 0.0),
+                             baseline_noise.get(scale, {}).get(name, 0.0))
+                allowed = max(NOISE_FACTOR * spread, MIN_THRESHOLD)
+            else:
+                allowed = threshold
+
+            # fps gets worse going down, everything else going up
+            change = (old - value) / old if name == 'fps' else (value - old) / old
+
+            if change > allowed:
+                regressions.append(
+                    f'{scale}x {name}: {old:.3f} -> {value:.3f} ({change:+.0%}, allowed {allowed:.0%})')
+
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+',
+                        choices=SCALES.keys(), default=list(SCALES.keys()))
+    parser.add_argument('--frames', type=int, default=300,
+                        help='frames measured per run, the same at every scale')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='runs per scale, the best one is kept')
+    parser.add_argument('--alloc-frames', type=int, default=30)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='fixed relative change counted as a regression (default: from the measured noise)')
+    parser.add_argument('--save', action='store_true',
+                        help='store this run as the new baseline')
+    args = parser.parse_args()
+
+    results = {}
+    noise = {}
+    regressions = []
+
+    for scale in args.scales:
+        results[str(scale)], noise[str(scale)] = bench_scale(
+            scale, args.frames, args.alloc_frames, args.repeats)
+
+        print(f'\n{scale}x (best of {args.repeats} runs of {args.frames} frames)')
+        for name, value in results[str(scale)].items():
+            spread = noise[str(scale)].get(name)
+            spread = f' \u00b1{spread:>6.1%}' if spread is not None else ''
+            print(f'  {name:<34} {value:>12.3f}{spread}')
+
+    pygame.quit()
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = compare(results, baseline['results'], noise,
+                              baseline['noise'], args.threshold)
+
+        print()
+        if regressions:
+            print('Regressions against the baseline:')
+            for regression in regressions:
+                print(f'  {regression}')
+        else:
+            print('No regressions against the baseline')
+
+    if args.save:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'results': results, 'noise': noise},
+                      baseline_file, indent=2)
+
+        print(f'Baseline saved to {args.baseline}')
+
+    if regressions and not args.save:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import cpu_count, sep, walk
+from typing import *
+from warnings import warn
+import pygame
+
+# Images the game never loads (so preloading them would only waste memory)
+PRELOAD_EXCLUDE = ('graphics/particles/smoke/', 'graphics/particles/smoke2/',
+                   'graphics/test/rock.png', 'graphics/tilemap/')
+# Images loaded without per pixel alpha (listed first, the big floor takes longest)
+OPAQUE_IMAGES = ('graphics/tilemap/ground.png',)
+
+
+class AssetRegistry:
+    """Process wide cache so every image, folder and sound is loaded only once
+
+    The surfaces and sounds handed out are shared between every user, so they
+    must be treated as read-only (copy them before changing alpha, volume, etc.)
+    """
+
+    def __init__(self) -> None:
+        self.images: Dict[Tuple[str, bool], pygame.Surface] = {}
+        self.folders: Dict[str, List[pygame.Surface]] = {}
+        self.sounds: Dict[Tuple[str, Optional[float]], pygame.mixer.Sound] = {}
+
+        # (id(source), kind, value) -> (source, variant), the source is kept so its id stays unique
+        self.variants: Dict[Tuple[int, str, Any], Tuple[pygame.Surface, pygame.Surface]] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        # Loads that happen after freeze() (during gameplay frames)
+        self.frozen = False
+        self.strict = False
+        self.late_loads: List[str] = []
+
+    def image(self, path: str, alpha: bool = True) -> pygame.Surface:
+        """Get a converted image (with per pixel alpha unless alpha is False)"""
+        key = (path, alpha)
+        surface = self.images.get(key)
+
+        if surface is None:
+            self.miss(path)
+            surface = pygame.image.load(path)
+            surface = surface.convert_alpha() if alpha else surface.convert()
+            self.images[key] = surface
+        else:
+            self.hits += 1
+
+        return surface
+
+    def release(self, path: str, alpha: bool = True):
+        """Forget a cached image, for big one-off images that are split up after loading"""
+        self.images.pop((path, alpha), None)
+
+    def preload(self, manifest: Sequence[Tuple[str, bool]], workers: Optional[int] = None, progress: Optional[Callable[[int, int], None]] = None):
+        """Decode a list of (path, alpha) images on a thread pool
+
+        pygame releases the GIL while decoding, so the files are read and
+        decoded in parallel. Converting needs the display, so it happens here
+        on the calling thread as each image arrives. progress(done, total) is
+        called after each one.
+        """
+        pending = [(path, alpha) for path, alpha in manifest
+                   if (path, alpha) not in self.images]
+        total = len(pending)
+
+        if workers is None:
+            workers = min(8, cpu_count() or 1)
+
+        # Threads only add overhead without a second core to decode on
+        if workers <= 1:
+            for done, (path, alpha) in enumerate(pending, 1):
+                self.image(path, alpha)
+
+                if progress:
+                    progress(done, total)
+
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(pygame.image.load, path): (path, alpha)
+                       for path, alpha in pending}
+
+            for done, future in enumerate(as_completed(futures), 1):
+                path, alpha = futures[future]
+                surface = future.result()
+
+                self.miss(path)
+                self.images[(path, alpha)] = surface.convert_alpha() if alpha else surface.convert()
+
+                if progress:
+                    progress(done, total)
+
+    def folder(self, path: str) -> List[pygame.Surface]:
+        """Get all images from a folder"""
+        surfaces = self.folders.get(path)
+
+        if surfaces is None:
+            self.miss(path)
+            surfaces = []
+
+            for _, __, image_files in walk(path):
+                for img in image_files:
+                    surfaces.append(self.image(path + '/' + img))
+
+            self.folders[path] = surfaces
+        else:
+            self.hits += 1
+
+        # A new list so callers can't reorder the cached one
+        return list(surfaces)
+
+    def sound(self, path: str, volume: Optional[float] = None) -> pygame.mixer.Sound:
+        """Get a sound, sharing one buffer per (path, volume)"""
+        key = (path, volume)
+        sound = self.sounds.get(key)
+
+        if sound is None:
+            self.miss(path)
+            sound = pygame.mixer.Sound(path)
+
+            if volume is not None:
+                sound.set_volume(volume)
+
+            self.sounds[key] = sound
+        else:
+            self.hits += 1
+
+        return sound
+
+    def variant(self, surface: pygame.Surface, kind: Literal['alpha', 'tint'], value: Any) -> pygame.Surface:
+        """Get a cached modified copy of a surface
+
+        'alpha' sets the whole surface alpha (0-255), 'tint' multiplies every
+        pixel by a color. The shared source surface is never changed.
+        """
+        key = (id(surface), kind, value)
+        cached = self.variants.get(key)
+
+        if cached is not None:
+            return cached[1]
+
+        variant = surface.copy()
+
+        if kind == 'alpha':
+            variant.set_alpha(value)
+        else:
+            variant.fill(value, special_flags=pygame.BLEND_RGBA_MULT)
+
+        self.variants[key] = (surface, variant)
+
+        return variant
+
+    def miss(self, path: str):
+        """Count a cache miss, flagging it if loading should be over"""
+        self.misses += 1
+
+        if self.frozen:
+            if self.strict:
+                raise RuntimeError(f'Asset loaded from disk during gameplay: {path}')
+
+            self.late_loads.append(path)
+            warn(f'Asset loaded from disk during gameplay: {path}')
+
+    def freeze(self, strict: bool = False):
+        """Mark the end of loading, any later disk load is recorded in late_loads (or raises if strict)"""
+        self.frozen = True
+        self.strict = strict
+
+    def thaw(self):
+        """Start another loading phase (building a new level), until the next freeze()"""
+        self.frozen = False
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache hits/misses and the memory held by the cached assets"""
+        surfaces = list(self.images.values())
+        surfaces.extend(variant for _, variant in self.variants.values())
+        image_bytes = sum(surface.get_pitch() * surface.get_height()
+                          for surface in surfaces)
+
+        sound_bytes = 0
+        mixer = pygame.mixer.get_init()
+
+        if mixer:
+            frequency, size, channels = mixer
+            bytes_per_second = frequency * channels * (abs(size) // 8)
+
+            sound_bytes = sum(int(sound.get_length() * bytes_per_second)
+                              for sound in self.sounds.values())
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'late_loads': len(self.late_loads),
+            'images': len(self.images),
+            'variants': len(self.variants),
+            'sounds': len(self.sounds),
+            'image_bytes': image_bytes,
+            'sound_bytes': sound_bytes
+        }
+
+
+def image_manifest(root: str = 'graphics') -> List[Tuple[str, bool]]:
+    """List every (path, alpha) image the game loads, in the keys AssetRegistry.image uses"""
+    manifest = [(path, False) for path in OPAQUE_IMAGES]
+
+    for folder, _, files in walk(root):
+        # Registry keys use forward slashes, walk() yields backslashes on Windows
+        folder = folder.replace(sep, '/')
+
+        for name in files:
+            path = folder + '/' + name
+
+            if name.endswith('.png') and not path.startswith(PRELOAD_EXCLUDE) and path not in OPAQUE_IMAGES:
+                manifest.append((path, True))
+
+    return manifest
+
+
+assets = AssetRegistry()
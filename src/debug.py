@@ -12,3 +12,26 @@ def debug(info: Any, y: int = 10, x: int = 10):
     debug_rect = debug_surf.get_rect(topleft=(x, y))
     pygame.draw.rect(display_surface, 'Black', debug_rect)
     display_surface.blit(debug_surf, debug_rect)
+
+
+def debug_graph(values: Sequence[float], budget: float, rect: pygame.Rect, color: str = 'White'):
+    """Draw values as bars scaled so `budget` reaches half the height (over budget turns red)"""
+    display_surface = pygame.display.get_surface()
+    pygame.draw.rect(display_surface, 'Black', rect)
+
+    if not values:
+        return
+
+    bar_width = max(1, rect.width // len(values))
+    scale = rect.height / (budget * 2)
+
+    for index, value in enumerate(values):
+        height = min(rect.height, int(value * scale))
+        bar = pygame.Rect(rect.left + index * bar_width,
+                          rect.bottom - height, bar_width, height)
+        pygame.draw.rect(display_surface,
+                         color if value <= budget else 'Red', bar)
+
+    budget_y = rect.bottom - int(budget * scale)
+    pygame.draw.line(display_surface, 'Gray', (rect.left, budget_y),
+                     (rect.right - 1, budget_y))
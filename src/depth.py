@@ -0,0 +1,117 @@
+from bisect import bisect_left, bisect_right
+from typing import *
+import pygame
+
+
+class DepthOrder:
+    """Keep sprites ordered by rect.centery without sorting everything every frame
+
+    Static sprites are sorted once when they are added. Dynamic sprites live in a
+    second sorted list where only the ones that moved get re-inserted, and both
+    lists are merged when the frame is drawn.
+    """
+
+    def __init__(self) -> None:
+        self.static_keys: List[int] = []
+        self.static_sprites: List[pygame.sprite.Sprite] = []
+        self.static_reach = 0
+
+        self.dynamic_keys: List[int] = []
+        self.dynamic_sprites: List[pygame.sprite.Sprite] = []
+        self.dynamic_lookup: Dict[pygame.sprite.Sprite, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.static_sprites) + len(self.dynamic_sprites)
+
+    @staticmethod
+    def insert(keys: List[int], sprites: List[pygame.sprite.Sprite], key: int, sprite: pygame.sprite.Sprite):
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        sprites.insert(index, sprite)
+
+    @staticmethod
+    def discard(keys: List[int], sprites: List[pygame.sprite.Sprite], key: int, sprite: pygame.sprite.Sprite):
+        index = bisect_left(keys, key)
+
+        while sprites[index] is not sprite:
+            index += 1
+
+        del keys[index]
+        del sprites[index]
+
+    def add(self, sprite: pygame.sprite.Sprite, static: bool):
+        """Add a sprite (static sprites must never move afterwards)"""
+        if static:
+            self.insert(self.static_keys, self.static_sprites,
+                        sprite.rect.centery, sprite)
+            self.static_reach = max(
+                self.static_reach, sprite.rect.height // 2 + 1)
+        else:
+            # Dynamic sprites may not have a rect yet, they are keyed on refresh()
+            self.dynamic_lookup[sprite] = None
+
+    def remove(self, sprite: pygame.sprite.Sprite):
+        if sprite in self.dynamic_lookup:
+            key = self.dynamic_lookup.pop(sprite)
+
+            if key is not None:
+                self.discard(self.dynamic_keys,
+                             self.dynamic_sprites, key, sprite)
+        else:
+            self.discard(self.static_keys, self.static_sprites,
+                         sprite.rect.centery, sprite)
+
+    def refresh(self):
+        """Re-insert the dynamic sprites whose centery changed since the last call"""
+        keys = self.dynamic_keys
+        sprites = self.dynamic_sprites
+        lookup = self.dynamic_lookup
+
+        for sprite, old_key in lookup.items():
+            key = sprite.rect.centery
+
+            if key != old_key:
+                if old_key is not None:
+                    self.discard(keys, sprites, old_key, sprite)
+
+                self.insert(keys, sprites, key, sprite)
+                lookup[sprite] = key
+
+    def ordered(self, view_rect: Optional[pygame.Rect] = None) -> List[pygame.sprite.Sprite]:
+        """Get the sprites meeting view_rect (or all of them) from back to front"""
+        static_keys = self.static_keys
+        static_sprites = self.static_sprites
+        dynamic_keys = self.dynamic_keys
+        dynamic_sprites = self.dynamic_sprites
+
+        if view_rect is None:
+            start, end = 0, len(static_keys)
+
+            def segment(begin: int, stop: int):
+                ordered.extend(static_sprites[begin:stop])
+        else:
+            start = bisect_left(static_keys, view_rect.top - self.static_reach)
+            end = bisect_right(static_keys, view_rect.bottom + self.static_reach)
+
+            def segment(begin: int, stop: int):
+                ordered.extend(
+                    sprite for sprite in static_sprites[begin:stop] if view_rect.colliderect(sprite.rect))
+
+        # Dynamic sprites are few, so each one is spliced into the static run
+        # with a binary search and the statics in between are copied in bulk
+        ordered = []
+        previous = start
+
+        for key, sprite in zip(dynamic_keys, dynamic_sprites):
+            if view_rect is not None and not view_rect.colliderect(sprite.rect):
+                continue
+
+            # Static sprites win ties, same as when they were added first
+            split = bisect_right(static_keys, key, previous, end)
+            segment(previous, split)
+            ordered.append(sprite)
+            previous = split
+
+        segment(previous, end)
+
+        return ordered
@@ -1,17 +1,23 @@
-from typing import Callable, Tuple
+from math import hypot
+from typing import Callable, List, Optional, Sequence, Tuple, Union
 from unittest.main import MAIN_EXAMPLES
 import pygame
 from player import Player
+from assets import assets
+from runtime import get_ticks
 from settings import *
+from sound import sounds
+from spatial import ObstacleGroup, SpatialGridGroup
 from entity import Entity
+from flowfield import FlowField
 from support import *
 
 
 class Enemy(Entity):
     """Generic enemy class"""
 
-    def __init__(self, monster_name: str, pos: Tuple[int, int], obstacle_sprites: pygame.sprite.Group, damage_player: Callable[[int, str], None], trigger_death_particles: Callable[[Tuple[int, int], str], None], add_exp: Callable[[int], None], *groups: pygame.sprite.AbstractGroup) -> None:
-        super().__init__(*groups)
+    def __init__(self, monster_name: str, pos: Tuple[int, int], obstacle_sprites: ObstacleGroup, damage_player: Callable[[int, str], None], trigger_death_particles: Callable[[Tuple[int, int], str], None], add_exp: Callable[[int], None], *groups: pygame.sprite.AbstractGroup) -> None:
+        super().__init__()
         self.sprite_type = 'enemy'
 
         self.import_graphics(monster_name)
@@ -46,13 +52,20 @@ class Enemy(Entity):
         self.hit_time = None
         self.invencibility_duration = 300
 
-        self.death_sound = pygame.mixer.Sound('audio/death.wav')
-        self.hit_sound = pygame.mixer.Sound('audio/hit.wav')
-        self.attack_sound = pygame.mixer.Sound(monster_info['attack_sound'])
+        # Filled once per frame for every enemy by EnemyGroup.sense
+        self.player_distance = 0.0
+        self.player_direction = (0.0, 0.0)
+        self.path_direction = (0.0, 0.0)
 
-        self.death_sound.set_volume(.2)
-        self.hit_sound.set_volume(.2)
-        self.attack_sound.set_volume(.3)
+        # Groups to rejoin when EnemyGroup wakes this enemy up
+        self.sleep_groups: List[pygame.sprite.AbstractGroup] = []
+
+        self.death_sound = assets.sound('audio/death.wav', .2)
+        self.hit_sound = assets.sound('audio/hit.wav', .2)
+        self.attack_sound = assets.sound(monster_info['attack_sound'], .3)
+
+        # Join the groups only once the rect exists (spatial groups index it)
+        self.add(*groups)
 
     def import_graphics(self, name: str):
         """Import enemy sprites + animations"""
@@ -62,6 +75,8 @@ class Enemy(Entity):
         for animation in self.animations.keys():
             self.animations[animation] = import_folder(main_path + animation)
 
+        self.prepare_flash(self.animations)
+
     def get_player_distance_direction(self, player: Player):
         """Get the distance and direction between enemy and player"""
         enemy_vec = pygame.math.Vector2(self.rect.center)
@@ -78,7 +93,7 @@ class Enemy(Entity):
 
     def get_status(self, player: Player):
         """Control enemy status"""
-        distance = self.get_player_distance_direction(player)[0]
+        distance = self.player_distance
 
         if distance <= self.attack_radius and self.can_attack:
             if self.status != 'attack':
@@ -93,7 +108,7 @@ class Enemy(Entity):
     def get_damage(self, player: Player, attack_type: str):
         """Get the damage data"""
         if self.vulnerable:
-            self.hit_sound.play()
+            sounds.play(self.hit_sound, 'hit', self.rect.center)
             self.direction = self.get_player_distance_direction(player)[1]
 
             if attack_type == 'weapon':
@@ -101,7 +116,7 @@ class Enemy(Entity):
             else:
                 self.health -= player.get_full_magic_damage()
 
-            self.hit_time = pygame.time.get_ticks()
+            self.hit_time = get_ticks()
             self.vulnerable = False
 
     def check_damage(self):
@@ -110,7 +125,7 @@ class Enemy(Entity):
             self.kill()
             self.trigger_death_particles(self.rect.center, self.monster_name)
             self.add_exp(self.exp)
-            self.death_sound.play()
+            sounds.play(self.death_sound, 'death', self.rect.center)
 
     def hit_reaction(self):
         """Called on hit"""
@@ -120,11 +135,11 @@ class Enemy(Entity):
     def actions(self, player: Player):
         """Control enemy based on status"""
         if self.status == 'attack':
-            self.attack_time = pygame.time.get_ticks()
-            self.attack_sound.play()
+            self.attack_time = get_ticks()
+            sounds.play(self.attack_sound, 'attack', self.rect.center)
             self.damage_player(self.attack_damage, self.attack_type)
         elif self.status == 'move':
-            self.direction = self.get_player_distance_direction(player)[1]
+            self.direction = pygame.math.Vector2(self.path_direction)
         else:
             self.direction = pygame.math.Vector2()
 
@@ -139,18 +154,12 @@ class Enemy(Entity):
                 self.can_attack = False
             self.frame_index = 0
 
-        self.image = animation[int(self.frame_index)]
+        self.image = self.flash(animation[int(self.frame_index)])
         self.rect = self.image.get_rect(center=self.hitbox.center)
 
-        if not self.vulnerable:
-            alpha = self.wave_value()
-            self.image.set_alpha(alpha)
-        else:
-            self.image.set_alpha(255)
-
     def cooldown(self):
         """Handle cooldowns"""
-        current_time = pygame.time.get_ticks()
+        current_time = get_ticks()
 
         if not self.can_attack and current_time - self.attack_time >= self.attack_cooldown:
             self.can_attack = True
@@ -168,3 +177,95 @@ class Enemy(Entity):
     def enemy_update(self, player: Player):
         self.get_status(player)
         self.actions(player)
+
+
+class EnemyGroup(pygame.sprite.Group):
+    """Registry of the awake enemies, senses the player for all of them in one pass
+
+    Enemies that end up far outside the screen are put to sleep: they leave
+    every group (so nothing animates, moves or draws them) and wait in a
+    spatial grid until the camera gets close again.
+    """
+
+    def __init__(self, *sprites: Union[pygame.sprite.Sprite, Sequence[pygame.sprite.Sprite]], flow_field: Optional[FlowField] = None) -> None:
+        super().__init__(*sprites)
+
+        # Shared paths to the player, enemies walk straight at them without one
+        self.flow_field = flow_field
+
+        # Sleepers don't move, so a coarse static grid finds the ones to wake
+        self.sleeping = SpatialGridGroup(
+            cell_size=TILESIZE * 8, rect_attr='rect')
+
+        display_size = pygame.display.get_surface().get_size()
+        self.active_rect = pygame.Rect((0, 0), display_size).inflate(
+            ENEMY_ACTIVE_MARGIN * 2, ENEMY_ACTIVE_MARGIN * 2)
+        self.sleep_rect = self.active_rect.inflate(TILESIZE * 2, TILESIZE * 2)
+
+    def sleep(self, enemy: Enemy):
+        """Freeze an enemy, remembering the groups it has to go back to"""
+        enemy.sleep_groups = [
+            group for group in enemy.groups() if group is not self]
+        enemy.remove(self, *enemy.sleep_groups)
+        enemy.direction = pygame.math.Vector2()
+
+        self.sleeping.add(enemy)
+
+    def wake(self, enemy: Enemy):
+        self.sleeping.remove(enemy)
+        enemy.add(self, *enemy.sleep_groups)
+        enemy.sleep_groups = []
+
+    def update_activation(self, player: Player):
+        """Wake the sleepers near the camera and put the far awake ones to sleep"""
+        # The camera is centered on the player, the sleep rect is bigger to avoid flapping
+        self.active_rect.center = player.rect.center
+        self.sleep_rect.center = player.rect.center
+
+        for enemy in self.sleeping.query(self.active_rect):
+            if self.active_rect.colliderect(enemy.rect):
+                self.wake(enemy)
+
+        far_enemies = [
+            enemy for enemy in self.spritedict if not self.sleep_rect.colliderect(enemy.rect)
+        ]
+
+        for enemy in far_enemies:
+            self.sleep(enemy)
+
+    def sense(self, player: Player):
+        """Store every enemy's distance and unit direction to the player, and its way there"""
+        player_x, player_y = player.rect.center
+        flow_field = self.flow_field
+
+        if flow_field:
+            flow_field.update(player.hitbox.center)
+
+        for enemy in self.spritedict:
+            enemy_x, enemy_y = enemy.rect.center
+            dx = player_x - enemy_x
+            dy = player_y - enemy_y
+            distance = hypot(dx, dy)
+
+            enemy.player_distance = distance
+            enemy.player_direction = (dx / distance, dy / distance) if distance > 0 else (0.0, 0.0)
+            enemy.path_direction = enemy.player_direction
+
+            # Head for the next tile on the path (straight at the player on its tile or off the field)
+            point = flow_field.next_point(enemy.hitbox.center) if flow_field else None
+
+            if point:
+                dx = point[0] - enemy.hitbox.centerx
+                dy = point[1] - enemy.hitbox.centery
+                step = hypot(dx, dy)
+
+                if step > 0:
+                    enemy.path_direction = (dx / step, dy / step)
+
+    def enemy_update(self, player: Player):
+        """Update enemies"""
+        self.update_activation(player)
+        self.sense(player)
+
+        for enemy in self.sprites():
+            enemy.enemy_update(player)
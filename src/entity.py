@@ -1,6 +1,8 @@
 from math import sin
-from typing import Literal
+from typing import Dict, List, Literal
 import pygame
+from assets import assets
+from runtime import get_ticks
 
 
 class Entity(pygame.sprite.Sprite):
@@ -17,18 +19,23 @@ class Entity(pygame.sprite.Sprite):
         if self.direction.magnitude() != 0:
             self.direction = self.direction.normalize()
 
+        start = self.hitbox.x
         self.hitbox.x += self.direction.x * speed
-        self.collision('horizontal')
+        self.collision('horizontal', start)
 
+        start = self.hitbox.y
         self.hitbox.y += self.direction.y * speed
-        self.collision('vertical')
+        self.collision('vertical', start)
 
         self.rect.center = self.hitbox.center
 
-    def collision(self, direction: Literal['horizontal', 'vertical']):
-        """Check for collisions in X and Y direction"""
+    def collision(self, direction: Literal['horizontal', 'vertical'], start: int):
+        """Check for collisions in X and Y direction (start is the hitbox x or y before the move)"""
         if direction == 'horizontal':
-            for sprite in self.obstacle_sprites:
+            self.obstacle_sprites.resolve_walls(
+                self.hitbox, direction, self.direction.x, start)
+
+            for sprite in self.obstacle_sprites.query(self.hitbox):
                 if sprite.hitbox.colliderect(self.hitbox):
                     if self.direction.x > 0:
                         self.hitbox.right = sprite.hitbox.left
@@ -36,15 +43,31 @@ class Entity(pygame.sprite.Sprite):
                         self.hitbox.left = sprite.hitbox.right
 
         if direction == 'vertical':
-            for sprite in self.obstacle_sprites:
+            self.obstacle_sprites.resolve_walls(
+                self.hitbox, direction, self.direction.y, start)
+
+            for sprite in self.obstacle_sprites.query(self.hitbox):
                 if sprite.hitbox.colliderect(self.hitbox):
                     if self.direction.y > 0:
                         self.hitbox.bottom = sprite.hitbox.top
                     if self.direction.y < 0:
                         self.hitbox.top = sprite.hitbox.bottom
 
+    def flash(self, frame: pygame.Surface) -> pygame.Surface:
+        """Pick the frame or its transparent variant, blinking while invulnerable"""
+        if not self.vulnerable and self.wave_value() != 255:
+            return assets.variant(frame, 'alpha', 0)
+
+        return frame
+
+    def prepare_flash(self, animations: Dict[str, List[pygame.Surface]]):
+        """Build the blink variants up front so the first hit doesn't copy surfaces"""
+        for frames in animations.values():
+            for frame in frames:
+                assets.variant(frame, 'alpha', 0)
+
     def wave_value(self):
-        value = sin(pygame.time.get_ticks())
+        value = sin(get_ticks())
 
         if value >= 0:
             return 255
@@ -0,0 +1,116 @@
+from typing import *
+from zlib import compress, decompress
+import pygame
+
+from assets import assets
+from settings import *
+
+
+class ChunkedFloor:
+    """Floor image split into fixed-size chunks, only the ones on screen are blitted
+
+    Chunks far from the camera are evicted: their pixels are kept zlib
+    compressed (the ground is mostly flat colors, so they shrink a lot) and
+    the surface is rebuilt when the camera comes back.
+    """
+
+    def __init__(self, path: str, view_rect: Optional[pygame.Rect] = None, chunk_size: int = FLOOR_CHUNK_SIZE, keep_margin: int = FLOOR_KEEP_MARGIN) -> None:
+        """Split the image, only the chunks near view_rect (the first frame's view) stay decoded"""
+        # Split right away, so the full image isn't kept in the asset registry
+        image = assets.image(path, alpha=False)
+        assets.release(path, alpha=False)
+
+        self.chunk_size = chunk_size
+        self.keep_margin = keep_margin
+        self.rect = image.get_rect(topleft=(0, 0))
+        self.columns = -(-self.rect.width // chunk_size)
+        self.rows = -(-self.rect.height // chunk_size)
+
+        self.chunk_rects: Dict[Tuple[int, int], pygame.Rect] = {}
+        self.resident: Dict[Tuple[int, int], pygame.Surface] = {}
+        self.compressed: Dict[Tuple[int, int], bytes] = {}
+
+        keep_rect = None
+
+        if view_rect is not None:
+            keep_rect = view_rect.inflate(keep_margin * 2, keep_margin * 2)
+
+        # Everything else is compressed straight from the image, the full
+        # image and the chunks are never all decoded at once
+        for row in range(self.rows):
+            for col in range(self.columns):
+                rect = pygame.Rect(col * chunk_size, row * chunk_size,
+                                   chunk_size, chunk_size).clip(self.rect)
+                chunk = image.subsurface(rect)
+
+                self.chunk_rects[(col, row)] = rect
+                self.compressed[(col, row)] = compress(
+                    pygame.image.tobytes(chunk, 'RGB'), 1)
+
+                if keep_rect is not None and keep_rect.colliderect(rect):
+                    self.resident[(col, row)] = chunk.copy()
+
+        self.loads = 0
+        self.evictions = 0
+
+    def chunk_range(self, rect: pygame.Rect) -> Tuple[int, int, int, int]:
+        """Get the (left, top, right, bottom) chunk indexes a rect meets, clamped to the image"""
+        size = self.chunk_size
+
+        return (max(rect.left // size, 0), max(rect.top // size, 0),
+                min((rect.right - 1) // size, self.columns - 1),
+                min((rect.bottom - 1) // size, self.rows - 1))
+
+    def chunk(self, key: Tuple[int, int]) -> pygame.Surface:
+        """Get a chunk's surface, rebuilding it if it was evicted"""
+        surface = self.resident.get(key)
+
+        if surface is None:
+            rect = self.chunk_rects[key]
+            surface = pygame.image.frombytes(
+                decompress(self.compressed[key]), rect.size, 'RGB').convert()
+
+            self.resident[key] = surface
+            self.loads += 1
+
+        return surface
+
+    def evict(self, view_rect: pygame.Rect):
+        """Drop the chunks further than keep_margin from the view"""
+        keep_rect = view_rect.inflate(self.keep_margin * 2, self.keep_margin * 2)
+        far = [key for key in self.resident
+               if not keep_rect.colliderect(self.chunk_rects[key])]
+
+        # Pixels never change and every chunk was compressed at load, so evicting is free
+        for key in far:
+            del self.resident[key]
+            self.evictions += 1
+
+    def draw(self, surface: pygame.Surface, view_rect: pygame.Rect):
+        """Blit the chunks that meet view_rect (in world coordinates)"""
+        left, top, right, bottom = self.chunk_range(view_rect)
+        offset_x, offset_y = view_rect.topleft
+
+        blits = []
+
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                rect = self.chunk_rects[(col, row)]
+                blits.append((self.chunk((col, row)),
+                              (rect.x - offset_x, rect.y - offset_y)))
+
+        surface.blits(blits, False)
+
+        self.evict(view_rect)
+
+    def stats(self) -> Dict[str, int]:
+        """Get chunk residency and the memory held by resident and compressed chunks"""
+        return {
+            'chunks': len(self.chunk_rects),
+            'resident': len(self.resident),
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'resident_bytes': sum(chunk.get_pitch() * chunk.get_height()
+                                  for chunk in self.resident.values()),
+            'compressed_bytes': sum(len(data) for data in self.compressed.values())
+        }
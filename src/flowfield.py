@@ -0,0 +1,140 @@
+from array import array
+from heapq import heappop, heappush
+from typing import *
+import pygame
+
+from settings import *
+from spatial import ObstacleGroup
+
+# (dx, dy, cost) to the 8 neighbours, diagonals cost ~sqrt(2)
+NEIGHBOURS = ((1, 0, 10), (-1, 0, 10), (0, 1, 10), (0, -1, 10),
+              (1, 1, 14), (1, -1, 14), (-1, 1, 14), (-1, -1, 14))
+
+
+class FlowField:
+    """Shortest paths to the player's tile for every tile around it
+
+    One Dijkstra search from the player's tile over the wall bitmap and the
+    obstacle sprites, redone only when the player enters another tile or the
+    obstacles change (cut grass, streamed regions). Each tile stores the next
+    tile on its path, so any number of enemies read their way in O(1).
+    """
+
+    def __init__(self, obstacles: ObstacleGroup, radius: int = FLOW_FIELD_RADIUS) -> None:
+        self.obstacles = obstacles
+        self.radius = radius
+        self.size = radius * 2 + 1
+
+        # Player tile the field leads to and the top left tile of the field
+        self.goal: Optional[Tuple[int, int]] = None
+        self.left = 0
+        self.top = 0
+
+        # Obstacle version the field was built from
+        self.version = -1
+
+        # Field index of the next tile towards the goal, -1 for the goal and unreachable tiles
+        self.next = array('i', [-1]) * (self.size * self.size)
+        self.builds = 0
+
+    def update(self, pos: Tuple[int, int]):
+        """Rebuild the field if pos (the player's position) is on another tile or an obstacle changed"""
+        goal = (pos[0] // TILESIZE, pos[1] // TILESIZE)
+
+        if goal != self.goal or self.obstacles.version != self.version:
+            self.build(goal)
+
+    def blocked_cells(self) -> bytearray:
+        """Mark the field's walls and the tiles whose center is inside an obstacle's hitbox"""
+        size = self.size
+        left, top = self.left, self.top
+        obstacles = self.obstacles
+        blocked = bytearray(size * size)
+
+        for row in range(size):
+            for col in range(size):
+                if obstacles.is_solid(left + col, top + row):
+                    blocked[row * size + col] = 1
+
+        area = pygame.Rect(left * TILESIZE, top * TILESIZE,
+                           size * TILESIZE, size * TILESIZE)
+        half = TILESIZE // 2
+
+        for sprite in obstacles.query(area):
+            hitbox = sprite.hitbox
+
+            for row in range(max(hitbox.top // TILESIZE, top), min((hitbox.bottom - 1) // TILESIZE, top + size - 1) + 1):
+                for col in range(max(hitbox.left // TILESIZE, left), min((hitbox.right - 1) // TILESIZE, left + size - 1) + 1):
+                    if hitbox.collidepoint(col * TILESIZE + half, row * TILESIZE + half):
+                        blocked[(row - top) * size + col - left] = 1
+
+        return blocked
+
+    def build(self, goal: Tuple[int, int]):
+        size = self.size
+        self.goal = goal
+        self.left = goal[0] - self.radius
+        self.top = goal[1] - self.radius
+        self.version = self.obstacles.version
+
+        blocked = self.blocked_cells()
+        start = self.radius * size + self.radius
+        blocked[start] = 0
+
+        next_cell = array('i', [-1]) * (size * size)
+        distance = [None] * (size * size)
+        distance[start] = 0
+        queue = [(0, start)]
+
+        while queue:
+            cost, index = heappop(queue)
+
+            if cost > distance[index]:
+                continue
+
+            row, col = divmod(index, size)
+
+            for dx, dy, step in NEIGHBOURS:
+                ncol, nrow = col + dx, row + dy
+
+                if not (0 <= ncol < size and 0 <= nrow < size):
+                    continue
+
+                neighbour = nrow * size + ncol
+
+                if blocked[neighbour]:
+                    continue
+
+                # No cutting corners past a wall
+                if dx and dy and (blocked[row * size + ncol] or blocked[nrow * size + col]):
+                    continue
+
+                new_cost = cost + step
+                old_cost = distance[neighbour]
+
+                if old_cost is None or new_cost < old_cost:
+                    distance[neighbour] = new_cost
+                    next_cell[neighbour] = index
+                    heappush(queue, (new_cost, neighbour))
+
+        self.next = next_cell
+        self.builds += 1
+
+    def next_point(self, pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """Get the center of the next tile on the way from pos, None outside the field, unreachable or on the goal"""
+        col = pos[0] // TILESIZE - self.left
+        row = pos[1] // TILESIZE - self.top
+        size = self.size
+
+        if not (0 <= col < size and 0 <= row < size):
+            return None
+
+        index = self.next[row * size + col]
+
+        if index < 0:
+            return None
+
+        row, col = divmod(index, size)
+        half = TILESIZE // 2
+
+        return ((self.left + col) * TILESIZE + half, (self.top + row) * TILESIZE + half)
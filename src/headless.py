@@ -0,0 +1,161 @@
+#! /usr/bin/env python3
+"""Run the level without a window, audio device or keyboard, as fast as the CPU allows
+
+Every frame advances a virtual clock by one fixed step (1000 / FPS ms), so
+cooldowns and animations behave exactly as at FPS no matter how fast it runs.
+
+Run from the repository root: python src/headless.py --frames 3600 --script patrol
+Replay a session recorded with `python src/main.py --record session.rpl`:
+    python src/headless.py --replay session.rpl
+"""
+
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import *
+import pygame
+
+import runtime
+from assets import assets
+from replay import Recording, map_signature, state_checksum
+from settings import *
+
+Script = Callable[[int], Iterable[int]]
+
+
+def idle(frame: int) -> Iterable[int]:
+    """Press nothing"""
+    return ()
+
+
+def patrol(frame: int) -> Iterable[int]:
+    """Walk a square, swinging the weapon and casting now and then"""
+    directions = (pygame.K_LEFT, pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN)
+    pressed = [directions[(frame // 90) % len(directions)]]
+
+    if frame % 40 == 0:
+        pressed.append(pygame.K_SPACE)
+    if frame % 150 == 75:
+        pressed.append(pygame.K_LCTRL)
+    if frame % 600 == 300:
+        pressed.append(pygame.K_q)
+
+    return pressed
+
+
+def timeline(*spans: Tuple[int, int, Iterable[int]]) -> Script:
+    """Build a script from (first frame, last frame, keys) spans"""
+    def script(frame: int) -> Iterable[int]:
+        pressed = []
+
+        for start, end, keys in spans:
+            if start <= frame <= end:
+                pressed.extend(keys)
+
+        return pressed
+
+    return script
+
+
+SCRIPTS: Dict[str, Script] = {'idle': idle, 'patrol': patrol}
+
+
+class HeadlessRunner:
+    """Build a Level on SDL's dummy drivers and step it with scripted input"""
+
+    def __init__(self, script: Script = idle, step_ms: float = 1000 / FPS, level_factory: Optional[Callable[[], Any]] = None, seed: int = 0) -> None:
+        pygame.init()
+        self.screen = pygame.display.set_mode((WIDTH, HEIGTH))
+
+        self.script = script
+        self.clock = runtime.VirtualClock(step_ms)
+        self.keys = runtime.KeyState()
+        runtime.set_ticks_source(self.clock.get_ticks)
+        runtime.set_keys_source(lambda: self.keys)
+        runtime.seed(seed)
+
+        if level_factory is None:
+            from level import Level
+            level_factory = Level
+
+        assets.thaw()
+        self.level = level_factory()
+        assets.freeze()
+
+        self.frame = 0
+
+    def step(self, draw: bool = True):
+        """Feed this frame's keys and advance the simulation one fixed step"""
+        pressed = frozenset(self.script(self.frame))
+
+        # The menu toggles on key down, like the KEYDOWN event in Game.run
+        if pygame.K_m in pressed and pygame.K_m not in self.keys.pressed:
+            self.level.toggle_menu()
+
+        self.keys = runtime.KeyState(pressed)
+        pygame.event.pump()
+
+        if draw:
+            self.screen.fill(WATER_COLOR)
+            self.level.draw()
+
+        self.level.update()
+
+        self.clock.advance()
+        self.frame += 1
+
+    def run(self, frames: int, draw: bool = True) -> Dict[str, float]:
+        """Step the given number of frames and report the throughput"""
+        start = perf_counter()
+
+        for _ in range(frames):
+            self.step(draw)
+
+        elapsed = perf_counter() - start
+
+        return {
+            'frames': frames,
+            'seconds': elapsed,
+            'fps': frames / elapsed if elapsed else float('inf'),
+            'ms_per_frame': elapsed / frames * 1000 if frames else 0.0,
+            'simulated_seconds': self.clock.time / 1000,
+            'late_loads': len(assets.late_loads)
+        }
+
+    def close(self):
+        runtime.reset_sources()
+        pygame.quit()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=FPS * 60)
+    parser.add_argument('--script', choices=SCRIPTS.keys(), default='patrol')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-draw', action='store_true',
+                        help='only step the simulation, skip world and UI drawing')
+    parser.add_argument('--replay', metavar='PATH',
+                        help='play back a recording instead of a script (sets frames and seed)')
+    args = parser.parse_args()
+
+    if args.replay:
+        recording = Recording.load(args.replay)
+
+        if recording.signature != map_signature():
+            print('warning: the map changed since this session was recorded')
+
+        runner = HeadlessRunner(recording.keys, recording.step_ms, seed=recording.seed)
+        result = runner.run(len(recording), draw=not args.no_draw)
+        result['replay_matches'] = state_checksum(runner.level) == recording.checksum
+    else:
+        runner = HeadlessRunner(SCRIPTS[args.script], seed=args.seed)
+        result = runner.run(args.frames, draw=not args.no_draw)
+
+    runner.close()
+
+    for name, value in result.items():
+        print(f'{name:>18}: {value:.3f}' if isinstance(value, float) else f'{name:>18}: {value}')
@@ -1,13 +1,22 @@
 from pydoc import visiblename
-from random import randint, choice
 from typing import *
 import pygame
-from enemy import Enemy
+from depth import DepthOrder
+from floor import ChunkedFloor
+from flowfield import FlowField
+from enemy import Enemy, EnemyGroup
 from magic import MagicPlayer
-from particles import AnimationPlayer
+from map_cache import MapData, load_map
+from particles import AnimationPlayer, ParticleSystem
+from profiler import profiler
 
+from runtime import get_ticks, rng
 from settings import *
 from player import Player
+from pool import SpritePool
+from spatial import ObstacleGroup, SpatialGridGroup
+from sound import sounds
+from streaming import RegionStreamer
 from support import *
 from tile import Tile
 from ui import UI
@@ -18,22 +27,43 @@ from upgrade import Upgrade
 class Level:
     """Handle the scene aspects like camera, map, etc."""
 
-    def __init__(self) -> None:
+    def __init__(self, map_data: Optional[MapData] = None) -> None:
+        if map_data is None:
+            map_data = load_map()
+
         # Get display surface
         self.display_surface = pygame.display.get_surface()
 
         self.game_paused = False
 
+        # Pause mode reuses one capture of the world and one render of the menu
+        self.paused_world: Optional[pygame.Surface] = None
+        self.paused_frame: Optional[pygame.Surface] = None
+        self.paused_state = None
+        self.paused_changed = False
+
         # Sprites group
         self.visible_sprites = YSortCameraGroup()
-        self.obstacle_sprites = pygame.sprite.Group()
+        # Obstacles are bucketed by tile so collisions only test nearby sprites,
+        # the invisible boundary is only a bitmap of solid cells
+        self.obstacle_sprites = ObstacleGroup(map_data.width, map_data.height)
 
         # Attack sprites
         self.current_attack = None
         self.attack_sprites = pygame.sprite.Group()
-        self.attackable_sprites = pygame.sprite.Group()
+        self.weapon_pool = SpritePool(
+            Weapon, self.visible_sprites, self.attack_sprites)
+        # Grass and enemies by area, so an attack only tests what is near it
+        self.attackable_sprites = SpatialGridGroup(rect_attr='rect')
 
-        self.create_map()
+        # Every awake enemy (sleepers wait in enemy_sprites.sleeping), so AI
+        # doesn't have to search visible_sprites
+        self.enemy_sprites = EnemyGroup(
+            flow_field=FlowField(self.obstacle_sprites))
+
+        self.create_map(map_data)
+        self.visible_sprites.load_floor(self.player)
+        Weapon.import_graphics()
 
         self.ui = UI()
         self.upgrade = Upgrade(self.player)
@@ -41,126 +71,118 @@ class Level:
         self.animation_player = AnimationPlayer()
         self.magic_player = MagicPlayer(self.animation_player)
 
-    def create_map(self):
-        """Create the map with the svgs on map/*.csv"""
-        layouts = {
-            'boundary': import_csv_layout('map/map_FloorBlocks.csv'),
-            'grass': import_csv_layout('map/map_Grass.csv'),
-            'object': import_csv_layout('map/map_Objects.csv'),
-            'entities': import_csv_layout('map/map_Entities.csv')
-        }
+    def create_map(self, map_data: Optional[MapData] = None):
+        """Set up the map from the compiled map/*.csv layers (or the given map data)
 
-        graphics = {
+        Only the walls and the player are created here, the tiles and enemies
+        are streamed in by regions around the camera.
+        """
+        if map_data is None:
+            map_data = load_map()
+
+        self.tile_graphics = {
             'grass': import_folder('graphics/grass'),
             'objects': import_folder('graphics/objects')
         }
 
-        for style, layout in layouts.items():
-            for row_index, row in enumerate(layout):
-                for col_index, col in enumerate(row):
-                    if col != '-1':
-                        x = col_index * TILESIZE
-                        y = row_index * TILESIZE
-
-                        if style == 'boundary':
-                            Tile((x, y), 'invisible', [self.obstacle_sprites])
-                        if style == 'grass':
-                            random_grass = choice(graphics['grass'])
-                            Tile(
-                                (x, y),
-                                'grass',
-                                [self.visible_sprites, self.obstacle_sprites,
-                                    self.attackable_sprites],
-                                surface=random_grass
-                            )
-
-                        if style == 'object':
-                            surface = graphics['objects'][int(col)]
-                            Tile((x, y), 'object', [
-                                 self.visible_sprites, self.obstacle_sprites], surface=surface)
-
-                        if style == 'entities':
-                            if col == '394':
-                                self.player = Player(
-                                    (x, y), self.obstacle_sprites, self.create_attack, self.create_magic, self.destroy_attack, [self.visible_sprites])
-                            else:
-                                if col == '390':
-                                    monster_name = 'bamboo'
-                                elif col == '391':
-                                    monster_name = 'spirit'
-                                elif col == '392':
-                                    monster_name = 'raccoon'
-                                else:
-                                    monster_name = 'squid'
-
-                                Enemy(monster_name,
-                                      (x, y),
-                                      self.obstacle_sprites,
-                                      self.damage_player,
-                                      self.trigger_death_particles,
-                                      self.add_exp,
-                                      [
-                                          self.visible_sprites, self.attackable_sprites
-                                      ])
+        for _, col_index, row_index in map_data.tiles('boundary'):
+            self.obstacle_sprites.set_solid(col_index, row_index)
+
+        for value, col_index, row_index in map_data.spawns:
+            if value == PLAYER_SPAWN:
+                self.player = Player(
+                    (col_index * TILESIZE, row_index * TILESIZE), self.obstacle_sprites, self.create_attack, self.create_magic, self.destroy_attack, [self.visible_sprites])
+
+        self.streamer = RegionStreamer(
+            map_data, self.create_tile, self.create_enemy)
+        self.streamer.update(self.player.rect.center)
+
+    def create_tile(self, style: str, value: int, col_index: int, row_index: int) -> Tile:
+        """Create a grass or object tile of the map"""
+        pos = (col_index * TILESIZE, row_index * TILESIZE)
+
+        if style == 'grass':
+            # Picked from the position, so a region looks the same every time it loads
+            grass = self.tile_graphics['grass']
+            surface = grass[((col_index * 73856093) ^ (row_index * 19349663)) % len(grass)]
+
+            return Tile(pos, 'grass', [self.visible_sprites, self.obstacle_sprites, self.attackable_sprites], surface=surface)
+
+        surface = self.tile_graphics['objects'][value]
+
+        return Tile(pos, 'object', [self.visible_sprites, self.obstacle_sprites], surface=surface)
+
+    def create_enemy(self, monster_name: str, pos: Tuple[int, int]) -> Enemy:
+        return Enemy(monster_name,
+                     pos,
+                     self.obstacle_sprites,
+                     self.damage_player,
+                     self.trigger_death_particles,
+                     self.add_exp,
+                     [
+                         self.visible_sprites, self.attackable_sprites, self.enemy_sprites
+                     ])
 
     def create_attack(self):
         """Create the weapon sprite"""
-        self.current_attack = Weapon(
-            self.player,
-            [self.visible_sprites, self.attack_sprites]
-        )
+        self.current_attack = self.weapon_pool.acquire(self.player)
 
     def create_magic(self, style: str, strength: int, cost: int):
         """Create the magic sprite"""
         if style == 'heal':
-            self.magic_player.heal(self.player, strength, cost, [
-                                   self.visible_sprites])
+            self.magic_player.heal(self.player, strength, cost)
         elif style == 'flame':
-            self.magic_player.flame(
-                self.player, cost, [self.visible_sprites, self.attack_sprites])
+            self.magic_player.flame(self.player, cost)
 
     def destroy_attack(self):
         """Destroy the weapon sprite"""
         if self.current_attack:
-            self.current_attack.kill()
+            self.weapon_pool.release(self.current_attack)
 
         self.current_attack = None
 
     def player_attack_logic(self):
         """Create the player damage interaction with the enemy"""
-        if self.attack_sprites:
-            for attack_sprite in self.attack_sprites:
-                collision_sprites = pygame.sprite.spritecollide(
-                    attack_sprite, self.attackable_sprites, False)
-
-                if collision_sprites:
-                    for target_sprite in collision_sprites:
-                        if target_sprite.sprite_type == 'grass':
-                            pos = target_sprite.rect.center
-                            offset = pygame.math.Vector2(0, 75)
-
-                            for leaf in range(randint(3, 6)):
-                                self.animation_player.create_grass_particles(
-                                    pos - offset, [self.visible_sprites])
-
-                            target_sprite.kill()
-                        else:
-                            target_sprite.get_damage(
-                                self.player, attack_sprite.sprite_type)
+        # Flames live in the particle system, not in attack_sprites
+        attacks = [(sprite.rect, sprite.sprite_type) for sprite in self.attack_sprites]
+        attacks.extend((rect, 'magic') for rect in self.animation_player.particles.attack_rects())
+
+        if not attacks:
+            return
+
+        # Grass never moves, only the awake enemies can be in stale cells
+        self.attackable_sprites.refresh(self.enemy_sprites)
+
+        for attack_rect, attack_type in attacks:
+            for target_sprite in self.attackable_sprites.query(attack_rect):
+                if attack_rect.colliderect(target_sprite.rect):
+                    self.hit_target(target_sprite, attack_type)
+
+    def hit_target(self, target_sprite: pygame.sprite.Sprite, attack_type: str):
+        """Cut grass or damage an enemy"""
+        if target_sprite.sprite_type == 'grass':
+            pos = target_sprite.rect.center
+            offset = pygame.math.Vector2(0, 75)
+
+            for leaf in range(rng.randint(3, 6)):
+                self.animation_player.create_grass_particles(pos - offset)
+
+            target_sprite.kill()
+        else:
+            target_sprite.get_damage(self.player, attack_type)
 
     def trigger_death_particles(self, pos: Tuple[int, int], particle_type: str):
         """Monsters death animation invocation"""
-        self.animation_player.create_particles(
-            particle_type, pos, [self.visible_sprites])
+        self.animation_player.create_particles(particle_type, pos)
 
     def damage_player(self, amount: int, attack_type: str):
         """Create the enemy damage interaction with the player"""
         if self.player.vulnerable:
             self.player.health -= amount
             self.player.vulnerable = False
-            self.player.hurt_time = pygame.time.get_ticks()
+            self.player.hurt_time = get_ticks()
             self.animation_player.create_particles(
-                attack_type, self.player.rect.center, [self.visible_sprites])
+                attack_type, self.player.rect.center)
 
     def add_exp(self, amount: int):
         """Add exp to player"""
@@ -170,22 +192,91 @@ class Level:
         """Toggle upgrade menu"""
         self.game_paused = not self.game_paused
 
-    def run(self):
-        self.visible_sprites.custom_draw(self.player)
+        # The world is captured again the next time the menu opens
+        self.paused_world = None
+        self.paused_frame = None
+        self.paused_state = None
+
+    @property
+    def idle(self) -> bool:
+        """True while paused and the last frame drew nothing new"""
+        return self.game_paused and not self.paused_changed
+
+    def draw_paused(self):
+        """Draw the world frozen under the menu, rendering the menu only when it changed"""
+        if self.paused_world is None:
+            self.visible_sprites.custom_draw(
+                self.player, self.animation_player.particles)
+            self.paused_world = self.display_surface.copy()
+
+        state = self.upgrade.state()
+        self.paused_changed = state != self.paused_state
+
+        if self.paused_changed:
+            self.display_surface.blit(self.paused_world, (0, 0))
+            self.ui.display(self.player)
+            self.upgrade.display()
+
+            self.paused_frame = self.display_surface.copy()
+            self.paused_state = state
+        else:
+            self.display_surface.blit(self.paused_frame, (0, 0))
+
+        if profiler.enabled:
+            profiler.lap('ui')
+
+    def draw(self, alpha: float = 1.0):
+        """Draw the world and the UI, alpha (0-1) interpolates between the last two update steps"""
+        if self.game_paused:
+            self.draw_paused()
+            return
+
+        self.visible_sprites.custom_draw(
+            self.player, self.animation_player.particles, alpha)
         self.ui.display(self.player)
 
+        if profiler.enabled:
+            profiler.lap('ui')
+
+    def update(self):
+        """Step the simulation one frame (or the upgrade menu while paused)"""
         if self.game_paused:
-            self.upgrade.display()
+            self.upgrade.update()
+
+            if profiler.enabled:
+                profiler.lap('update')
         else:
+            self.visible_sprites.snapshot()
+            self.streamer.update(self.player.rect.center)
+            sounds.set_listener(self.player.rect.center)
             self.visible_sprites.update()
-            self.visible_sprites.enemy_update(self.player)
+            self.animation_player.particles.update()
+
+            if profiler.enabled:
+                profiler.lap('update')
+
+            self.enemy_sprites.enemy_update(self.player)
+
+            if profiler.enabled:
+                profiler.lap('enemies')
+
             self.player_attack_logic()
 
+            if profiler.enabled:
+                profiler.lap('attack')
+
+    def run(self):
+        self.draw()
+        self.update()
+
 
 class YSortCameraGroup(pygame.sprite.Group):
     """Custom sprite group to centering the player rendering the sprites based on the Y axis"""
 
     def __init__(self, *sprites: Union[pygame.sprite.Sprite, Sequence[pygame.sprite.Sprite]]) -> None:
+        # Tiles never move, so only the player, enemies and effects get re-sorted
+        self.depth_order = DepthOrder()
+
         super().__init__(*sprites)
 
         self.display_surface = pygame.display.get_surface()
@@ -194,28 +285,103 @@ class YSortCameraGroup(pygame.sprite.Group):
         self.half_height = self.display_surface.get_size()[1] // 2
 
         self.offset = pygame.math.Vector2()
+        self.view_rect = self.display_surface.get_rect().inflate(
+            CAMERA_CULL_MARGIN * 2, CAMERA_CULL_MARGIN * 2)
+
+        # Built by load_floor() once the camera's first position is known
+        self.floor: Optional[ChunkedFloor] = None
+        self.screen_rect = self.display_surface.get_rect()
+
+        # Moving sprites' rect.topleft before the last update step
+        self.previous: Dict[pygame.sprite.Sprite, Tuple[int, int]] = {}
+
+    def load_floor(self, player: Player):
+        """Split the floor image, keeping only the chunks around the player decoded"""
+        self.screen_rect.center = player.rect.center
+        self.floor = ChunkedFloor(
+            'graphics/tilemap/ground.png', self.screen_rect)
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None):
+        super().add_internal(sprite)
+        self.depth_order.add(sprite, static=isinstance(sprite, Tile))
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite):
+        super().remove_internal(sprite)
+        self.depth_order.remove(sprite)
+
+    def snapshot(self):
+        """Remember where the moving sprites are before an update step"""
+        self.previous = {sprite: sprite.rect.topleft
+                         for sprite in self.depth_order.dynamic_lookup}
 
-        self.floor_surface = pygame.image.load(
-            'graphics/tilemap/ground.png').convert()
-        self.floor_rect = self.floor_surface.get_rect(topleft=(0, 0))
+    def interpolated(self, sprite: pygame.sprite.Sprite, alpha: float) -> Tuple[float, float]:
+        """Get where to draw a sprite between its last two steps (alpha 0 is the previous one)"""
+        x, y = sprite.rect.topleft
+        previous = self.previous.get(sprite)
 
-    def custom_draw(self, player: Player):
-        """Center player to camera"""
-        self.offset.x = player.rect.centerx - self.half_width
-        self.offset.y = player.rect.centery - self.half_height
+        if previous is None:
+            return x, y
 
-        floor_offset_pos = self.floor_rect.topleft - self.offset
-        self.display_surface.blit(self.floor_surface, floor_offset_pos)
+        return (previous[0] + (x - previous[0]) * alpha,
+                previous[1] + (y - previous[1]) * alpha)
 
-        for sprite in sorted(self.sprites(), key=lambda sprite: sprite.rect.centery):
-            offset_pos = sprite.rect.topleft - self.offset
-            self.display_surface.blit(sprite.image, offset_pos)
+    def update(self, *args, **kwargs):
+        """Update the moving sprites only, tiles have nothing to update"""
+        for sprite in list(self.depth_order.dynamic_lookup):
+            sprite.update(*args, **kwargs)
+
+    def visible_sprites(self) -> List[pygame.sprite.Sprite]:
+        """Get the sprites that meet the camera (plus a margin), back to front"""
+        view_rect = self.view_rect
+        view_rect.center = (self.offset.x + self.half_width,
+                            self.offset.y + self.half_height)
+
+        self.depth_order.refresh()
+
+        return self.depth_order.ordered(view_rect)
+
+    def custom_draw(self, player: Player, particles: Optional[ParticleSystem] = None, alpha: float = 1.0):
+        """Center player to camera, alpha below 1 draws the moving sprites between their last two steps"""
+        interpolate = alpha < 1 and bool(self.previous)
+
+        if interpolate:
+            x, y = self.interpolated(player, alpha)
+            self.offset.x = round(x) + player.rect.width // 2 - self.half_width
+            self.offset.y = round(y) + player.rect.height // 2 - self.half_height
+        else:
+            self.offset.x = player.rect.centerx - self.half_width
+            self.offset.y = player.rect.centery - self.half_height
+
+        self.screen_rect.topleft = (self.offset.x, self.offset.y)
+        self.floor.draw(self.display_surface, self.screen_rect)
+
+        if profiler.enabled:
+            profiler.lap('floor')
+
+        visible_sprites = self.visible_sprites()
+
+        if profiler.enabled:
+            profiler.lap('sort')
+
+        if interpolate:
+            previous = self.previous
+
+            for sprite in visible_sprites:
+                if sprite in previous:
+                    x, y = self.interpolated(sprite, alpha)
+                    offset_pos = (round(x) - self.offset.x, round(y) - self.offset.y)
+                else:
+                    offset_pos = sprite.rect.topleft - self.offset
+
+                self.display_surface.blit(sprite.image, offset_pos)
+        else:
+            for sprite in visible_sprites:
+                offset_pos = sprite.rect.topleft - self.offset
+                self.display_surface.blit(sprite.image, offset_pos)
 
-    def enemy_update(self, player: Player):
-        """Update enemies"""
-        enemy_sprites = [
-            sprite for sprite in self.sprites() if hasattr(sprite, 'sprite_type') and sprite.sprite_type == 'enemy'
-        ]
+        # Particles are drawn in one pass on top of the sorted sprites
+        if particles:
+            particles.draw(self.display_surface, self.offset)
 
-        for enemy in enemy_sprites:
-            enemy.enemy_update(player)
+        if profiler.enabled:
+            profiler.lap('sprites')
@@ -1,7 +1,9 @@
-from random import randint
 import pygame
+from assets import assets
+from sound import sounds
 from particles import AnimationPlayer
 from player import Player
+from runtime import rng
 from settings import *
 
 
@@ -9,12 +11,12 @@ class MagicPlayer:
     def __init__(self, animation_player: AnimationPlayer) -> None:
         self.animation_player = animation_player
         self.sounds = {
-            'heal': pygame.mixer.Sound('audio/heal.wav'),
-            'flame': pygame.mixer.Sound('audio/Fire.wav')
+            'heal': assets.sound('audio/heal.wav'),
+            'flame': assets.sound('audio/Fire.wav')
         }
 
-    def heal(self, player: Player, strength: int, cost: int, *groups: pygame.sprite.AbstractGroup):
-        self.sounds['heal'].play()
+    def heal(self, player: Player, strength: int, cost: int):
+        sounds.play(self.sounds['heal'], 'magic')
 
         if player.energy >= cost:
             player.health += strength
@@ -25,11 +27,11 @@ class MagicPlayer:
 
             pos = player.rect.center
 
-            self.animation_player.create_particles('aura', pos, *groups)
-            self.animation_player.create_particles('heal', pos, *groups)
+            self.animation_player.create_particles('aura', pos)
+            self.animation_player.create_particles('heal', pos)
 
-    def flame(self, player: Player, cost: int, *groups: pygame.sprite.AbstractGroup):
-        self.sounds['flame'].play()
+    def flame(self, player: Player, cost: int):
+        sounds.play(self.sounds['flame'], 'magic')
 
         if player.energy >= cost:
             player.energy -= cost
@@ -48,19 +50,19 @@ class MagicPlayer:
                     offset_x = (direction.x * i) * TILESIZE
 
                     x = player.rect.centerx + offset_x + \
-                        randint(-TILESIZE // 3, TILESIZE // 3)
+                        rng.randint(-TILESIZE // 3, TILESIZE // 3)
                     y = player.rect.centery + \
-                        randint(-TILESIZE // 3, TILESIZE // 3)
+                        rng.randint(-TILESIZE // 3, TILESIZE // 3)
 
                     self.animation_player.create_particles(
-                        'flame', (x, y), *groups)
+                        'flame', (x, y), attack=True)
                 else:
                     offset_y = (direction.y * i) * TILESIZE
 
                     x = player.rect.centerx + \
-                        randint(-TILESIZE // 3, TILESIZE // 3)
+                        rng.randint(-TILESIZE // 3, TILESIZE // 3)
                     y = player.rect.centery + offset_y + \
-                        randint(-TILESIZE // 3, TILESIZE // 3)
+                        rng.randint(-TILESIZE // 3, TILESIZE // 3)
 
                     self.animation_player.create_particles(
-                        'flame', (x, y), *groups)
+                        'flame', (x, y), attack=True)
@@ -1,8 +1,16 @@
 #! /usr/bin/env python3
 
+from argparse import ArgumentParser
 from cmath import log
-from settings import WATER_COLOR, WIDTH, HEIGTH, FPS
+from random import randrange
+from typing import Optional
+from settings import *
+from assets import assets, image_manifest
 from level import Level
+from profiler import profiler
+from replay import RECORD_KEYS, Recording, map_signature, state_checksum
+import runtime
+from sound import sounds
 import pygame
 import sys
 
@@ -10,7 +18,7 @@ import sys
 class Game:
     """Handles game loop"""
 
-    def __init__(self):
+    def __init__(self, record: Optional[str] = None, seed: Optional[int] = None):
 
         # general setup
         pygame.init()
@@ -18,29 +26,151 @@ class Game:
         self.screen = pygame.display.set_mode((WIDTH, HEIGTH))
         self.clock = pygame.time.Clock()
 
+        # Gameplay time only moves with update steps, so cooldowns don't depend on the frame rate
+        self.sim_clock = runtime.VirtualClock(1000 / FPS)
+        runtime.set_ticks_source(self.sim_clock.get_ticks)
+
+        # The simulation only sees the recordable keys, fed one update step at a time
+        self.keys = runtime.KeyState()
+        runtime.set_keys_source(lambda: self.keys)
+        self.menu_presses = 0
+        self.menu_toggled = False
+
+        if seed is None:
+            seed = randrange(2 ** 32)
+
+        runtime.seed(seed)
+        self.record_path = record
+        self.recording = Recording(seed, 1000 / FPS, signature=map_signature()) if record else None
+
+        # Decode every image up front, showing progress instead of a black window
+        self.font = pygame.font.Font(UI_FONT, UI_FONT_SIZE)
+        assets.preload(image_manifest(), progress=self.draw_loading)
+
         self.level = Level()
 
-        main_sound = pygame.mixer.Sound('audio/main.ogg')
-        main_sound.set_volume(.5)
-        main_sound.play(loops=-1)
+        # Everything is loaded, any disk load from now on is reported
+        assets.freeze()
+
+        sounds.play_music('audio/main.ogg', .5)
+
+    def draw_loading(self, done: int, total: int):
+        """Draw the loading bar"""
+        # Keep the window responsive while loading
+        pygame.event.pump()
+
+        bar_rect = pygame.Rect(0, 0, WIDTH // 2, BAR_HEIGHT)
+        bar_rect.center = (WIDTH // 2, HEIGTH // 2)
+        fill_rect = bar_rect.copy()
+        fill_rect.width = bar_rect.width * done // total
+
+        self.screen.fill(WATER_COLOR)
+        pygame.draw.rect(self.screen, UI_BG_COLOR, bar_rect)
+        pygame.draw.rect(self.screen, ENERGY_COLOR, fill_rect)
+        pygame.draw.rect(self.screen, UI_BORDER_COLOR, bar_rect, 3)
+
+        text_surf = self.font.render(f'Loading {done}/{total}', False, TEXT_COLOR)
+        self.screen.blit(text_surf, text_surf.get_rect(
+            midbottom=bar_rect.midtop - pygame.math.Vector2(0, 10)))
+
+        pygame.display.update()
+
+    def step(self):
+        """Run one update step with this moment's keys (recording them if asked to)"""
+        keyboard = pygame.key.get_pressed()
+        pressed = [key for key in RECORD_KEYS if key != pygame.K_m and keyboard[key]]
+
+        # Menu presses wait for a step, one per step, so a replay sees each toggle as its own press
+        if self.menu_presses and not self.menu_toggled:
+            self.menu_presses -= 1
+            self.menu_toggled = True
+            self.level.toggle_menu()
+            pressed.append(pygame.K_m)
+        else:
+            self.menu_toggled = False
+
+        if self.recording is not None:
+            self.recording.record(pressed)
+
+        self.keys = runtime.KeyState(pressed)
+        self.level.update()
+        self.sim_clock.advance()
+
+    def quit(self):
+        if self.recording is not None:
+            self.recording.checksum = state_checksum(self.level)
+            self.recording.save(self.record_path)
+
+        pygame.quit()
+        sys.exit()
 
     def run(self):
+        """Update at a fixed FPS steps per second, draw at up to RENDER_FPS"""
+        step_ms = 1000 / FPS
+        render_ms = 1000 / RENDER_FPS
+        last_time = pygame.time.get_ticks()
+        lag = 0.0
+        since_render = render_ms
+
         while True:
+            if profiler.enabled:
+                profiler.begin()
+
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
 
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_m:
-                        self.level.toggle_menu()
+                        self.menu_presses += 1
+
+                    # Frame profiler overlay (also enabled with ZELDA_PROFILE=1)
+                    if event.key == pygame.K_F3:
+                        profiler.toggle()
+
+            if profiler.enabled:
+                profiler.lap('events')
+
+            now = pygame.time.get_ticks()
+            elapsed = now - last_time
+            last_time = now
+
+            # Past MAX_FRAME_SKIP steps the missing time is dropped (slow motion instead of a spiral)
+            lag = min(lag + elapsed, step_ms * MAX_FRAME_SKIP)
+            since_render += elapsed
+
+            # Several steps without drawing in between when behind
+            while lag >= step_ms:
+                self.step()
+                lag -= step_ms
 
-            self.screen.fill(WATER_COLOR)
-            self.level.run()
-            pygame.display.update()
-            self.clock.tick(FPS)
+            if since_render >= render_ms:
+                since_render %= render_ms
+
+                self.screen.fill(WATER_COLOR)
+                self.level.draw(lag / step_ms)
+
+                if profiler.enabled:
+                    profiler.draw()
+
+                pygame.display.update()
+
+                if profiler.enabled:
+                    profiler.lap('flip')
+
+            if profiler.enabled:
+                profiler.end()
+
+            # The menu only changes on input, so poll it slower while idle
+            self.clock.tick(PAUSED_FPS if self.level.idle else max(FPS, RENDER_FPS))
 
 
 if __name__ == '__main__':
-    game = Game()
+    parser = ArgumentParser(description='Zelda')
+    parser.add_argument('--record', metavar='PATH',
+                        help='save the session for `python src/headless.py --replay PATH`')
+    parser.add_argument('--seed', type=int, help='random seed (random by default)')
+    args = parser.parse_args()
+
+    game = Game(args.record, args.seed)
     game.run()
@@ -0,0 +1,191 @@
+from array import array
+from hashlib import sha1
+from os import stat
+from struct import Struct, error as StructError
+from sys import byteorder
+from typing import *
+
+from support import import_csv_layout
+
+MAP_SOURCES = {
+    'boundary': 'map/map_FloorBlocks.csv',
+    'grass': 'map/map_Grass.csv',
+    'object': 'map/map_Objects.csv',
+    'entities': 'map/map_Entities.csv'
+}
+MAP_CACHE = 'map/map.bin'
+
+# Layers that become tiles, the entities layer is only kept as the spawn list
+TILE_LAYERS = ('boundary', 'grass', 'object')
+EMPTY = -1
+
+MAGIC = b'ZMAP'
+VERSION = 1
+HEADER = Struct('<4sHIIH20sI')  # magic, version, width, height, layers, signature, spawns
+LAYER_NAME = Struct('<B')
+
+
+class MapData:
+    """Map layers as flat int16 arrays (row major) plus the entity spawn list"""
+
+    def __init__(self, width: int, height: int, layers: Dict[str, array], spawns: List[Tuple[int, int, int]]) -> None:
+        self.width = width
+        self.height = height
+        self.layers = layers
+        self.spawns = spawns
+
+    @classmethod
+    def from_layouts(cls, layouts: Dict[str, List[List[str]]]) -> 'MapData':
+        """Build from CSV style layouts (lists of rows of strings)"""
+        height = len(layouts['entities'])
+        width = len(layouts['entities'][0]) if height else 0
+
+        layers = {
+            style: array('h', (int(col) for row in layouts[style] for col in row))
+            for style in TILE_LAYERS
+        }
+
+        spawns = [
+            (int(col), col_index, row_index)
+            for row_index, row in enumerate(layouts['entities'])
+            for col_index, col in enumerate(row) if int(col) != EMPTY
+        ]
+
+        return cls(width, height, layers, spawns)
+
+    def tiles(self, style: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (value, col, row) for every non-empty cell of a layer"""
+        width = self.width
+
+        for index, value in enumerate(self.layers[style]):
+            if value != EMPTY:
+                row, col = divmod(index, width)
+                yield value, col, row
+
+    def tiles_in(self, style: str, left: int, top: int, right: int, bottom: int) -> Iterator[Tuple[int, int, int]]:
+        """Yield (value, col, row) for the non-empty cells of a layer inside a tile area (inclusive)"""
+        layer = self.layers[style]
+        width = self.width
+
+        for row in range(top, bottom + 1):
+            start = row * width
+
+            for col in range(left, right + 1):
+                value = layer[start + col]
+
+                if value != EMPTY:
+                    yield value, col, row
+
+    def save(self, cache_path: str, signature: bytes):
+        layers = [(name.encode(), self.layers[name]) for name in TILE_LAYERS]
+        spawns = array('i', (value for spawn in self.spawns for value in spawn))
+
+        with open(cache_path, 'wb') as cache:
+            cache.write(HEADER.pack(MAGIC, VERSION, self.width, self.height,
+                                    len(layers), signature, len(self.spawns)))
+
+            for name, layer in layers:
+                cache.write(LAYER_NAME.pack(len(name)) + name)
+                cache.write(little_endian(array('h', layer)).tobytes())
+
+            cache.write(little_endian(spawns).tobytes())
+
+    @classmethod
+    def load(cls, cache_path: str, signature: bytes) -> Optional['MapData']:
+        """Read a cache file, None if it is missing, corrupt or built from other sources"""
+        try:
+            with open(cache_path, 'rb') as cache:
+                data = cache.read()
+        except OSError:
+            return None
+
+        try:
+            magic, version, width, height, layer_count, cached_signature, spawn_count = HEADER.unpack_from(
+                data)
+
+            if magic != MAGIC or version != VERSION or cached_signature != signature:
+                return None
+
+            offset = HEADER.size
+            layers = {}
+
+            for _ in range(layer_count):
+                name_size, = LAYER_NAME.unpack_from(data, offset)
+                offset += LAYER_NAME.size
+                name = data[offset:offset + name_size].decode()
+                offset += name_size
+
+                layer = array('h')
+                size = width * height * layer.itemsize
+                layer.frombytes(data[offset:offset + size])
+                layers[name] = little_endian(layer)
+                offset += size
+
+                if len(layer) != width * height:
+                    return None
+
+            spawns = array('i')
+            spawns.frombytes(data[offset:offset + spawn_count * 3 * spawns.itemsize])
+            spawns = little_endian(spawns)
+        except (StructError, ValueError, UnicodeDecodeError):
+            return None
+
+        if set(layers) != set(TILE_LAYERS) or len(spawns) != spawn_count * 3:
+            return None
+
+        return cls(width, height, layers,
+                   [tuple(spawns[index:index + 3]) for index in range(0, len(spawns), 3)])
+
+
+def little_endian(values: array) -> array:
+    """The cache is little endian, swap in place on big endian machines (pass a copy to keep the original)"""
+    if byteorder == 'big':
+        values.byteswap()
+
+    return values
+
+
+def sources_signature(sources: Dict[str, str]) -> bytes:
+    """Hash of the sources' names, sizes and mtimes (changes whenever a CSV is saved)"""
+    digest = sha1()
+
+    for style, source in sorted(sources.items()):
+        info = stat(source)
+        digest.update(f'{style}:{source}:{info.st_size}:{info.st_mtime_ns};'.encode())
+
+    return digest.digest()
+
+
+def load_map(sources: Dict[str, str] = MAP_SOURCES, cache_path: str = MAP_CACHE) -> MapData:
+    """Load the compiled map, rebuilding the cache from the CSVs when they changed"""
+    signature = sources_signature(sources)
+    map_data = MapData.load(cache_path, signature)
+
+    if map_data is None:
+        map_data = compile_map(sources, cache_path, signature)
+
+    return map_data
+
+
+def compile_map(sources: Dict[str, str] = MAP_SOURCES, cache_path: str = MAP_CACHE, signature: Optional[bytes] = None) -> MapData:
+    """Read every CSV layer and write them to the binary cache"""
+    layouts = {style: import_csv_layout(source)
+               for style, source in sources.items()}
+    map_data = MapData.from_layouts(layouts)
+
+    if signature is None:
+        signature = sources_signature(sources)
+
+    # A read-only install still works, it just compiles on every launch
+    try:
+        map_data.save(cache_path, signature)
+    except OSError:
+        pass
+
+    return map_data
+
+
+if __name__ == '__main__':
+    map_data = compile_map()
+    print(f'{MAP_CACHE}: {map_data.width}x{map_data.height}, '
+          f'{len(map_data.spawns)} spawns')
@@ -1,6 +1,8 @@
-from random import choice
-from typing import List, Tuple
+from array import array
+from typing import Dict, List, Tuple
 import pygame
+from runtime import rng
+from settings import PARTICLE_CAPACITY
 from support import import_folder
 
 
@@ -44,6 +46,14 @@ class AnimationPlayer:
             )
         }
 
+        self.particles = ParticleSystem()
+        self.animation_ids = {
+            name: self.particles.register(frames)
+            for name, frames in self.frames.items() if name != 'leaf'
+        }
+        self.leaf_ids = [self.particles.register(frames)
+                         for frames in self.frames['leaf']]
+
     def reflect_images(self, frames: List[pygame.Surface]):
         """Flip an list of images (X axis)"""
         new_frames = []
@@ -54,41 +64,133 @@ class AnimationPlayer:
 
         return new_frames
 
-    def create_grass_particles(self, pos: Tuple[int, int], *groups: pygame.sprite.AbstractGroup):
+    def create_grass_particles(self, pos: Tuple[int, int]):
         """Create grass particle animation"""
-        animation_frames = choice(self.frames['leaf'])
-
-        ParticleEffect(pos, animation_frames, *groups)
-
-    def create_particles(self, animation_type: str, pos: Tuple[int, int], *groups: pygame.sprite.AbstractGroup):
-        """Create a particle based on animation_type"""
-        animation_frames = self.frames[animation_type]
-
-        ParticleEffect(pos, animation_frames, *groups)
-
-
-class ParticleEffect(pygame.sprite.Sprite):
-    """Particles!"""
-
-    def __init__(self, pos: Tuple[int, int], animation_frames: List[pygame.Surface], *groups: pygame.sprite.AbstractGroup) -> None:
-        super().__init__(*groups)
-
-        self.sprite_type = 'magic'
-
-        self.frame_index = 0
-        self.animation_speed = 0.15
-        self.frames = animation_frames
-        self.image = self.frames[self.frame_index]
-        self.rect = self.image.get_rect(center=pos)
-
-    def animate(self):
-        """Animate particle then kill"""
-        self.frame_index += self.animation_speed
-
-        if self.frame_index >= len(self.frames):
-            self.kill()
+        self.particles.emit(rng.choice(self.leaf_ids), pos)
+
+    def create_particles(self, animation_type: str, pos: Tuple[int, int], attack: bool = False):
+        """Create a particle based on animation_type (attack particles damage what they touch)"""
+        self.particles.emit(self.animation_ids[animation_type], pos, attack)
+
+
+class ParticleSystem:
+    """Fixed capacity particle engine
+
+    Every particle is a slot in a set of parallel arrays (position, frame index,
+    animation id, attack flag), live particles are packed in [0, count) and a
+    dead one is replaced by the last, so updating is one loop and drawing is one
+    Surface.blits call. When full, a new particle replaces the oldest one.
+    """
+
+    def __init__(self, capacity: int = PARTICLE_CAPACITY, animation_speed: float = 0.15) -> None:
+        self.capacity = capacity
+        self.animation_speed = animation_speed
+
+        # Animations, indexed by the ids returned from register()
+        self.animations: List[List[pygame.Surface]] = []
+        self.lengths: List[int] = []
+        self.sizes: List[Tuple[int, int]] = []
+
+        # Particle slots
+        self.count = 0
+        self.x = array('i', bytes(4 * capacity))
+        self.y = array('i', bytes(4 * capacity))
+        self.frame = array('d', bytes(8 * capacity))
+        self.animation = array('H', bytes(2 * capacity))
+        self.attack = bytearray(capacity)
+        self.born = array('Q', bytes(8 * capacity))
+
+        self.emitted = 0
+        self.replaced = 0
+        self.high_water = 0
+
+    def register(self, frames: List[pygame.Surface]) -> int:
+        """Add an animation, returns its id"""
+        self.animations.append(frames)
+        self.lengths.append(len(frames))
+        self.sizes.append(frames[0].get_size())
+
+        return len(self.animations) - 1
+
+    def emit(self, animation_id: int, pos: Tuple[int, int], attack: bool = False):
+        """Start a particle centered on pos"""
+        if self.count < self.capacity:
+            index = self.count
+            self.count += 1
+            self.high_water = max(self.high_water, self.count)
         else:
-            self.image = self.frames[int(self.frame_index)]
+            # Overflow: the oldest particle is closest to finishing anyway
+            index = min(range(self.count), key=self.born.__getitem__)
+            self.replaced += 1
+
+        width, height = self.sizes[animation_id]
+        self.x[index] = int(pos[0]) - width // 2
+        self.y[index] = int(pos[1]) - height // 2
+        self.frame[index] = 0
+        self.animation[index] = animation_id
+        self.attack[index] = attack
+        self.born[index] = self.emitted
+        self.emitted += 1
+
+    def remove(self, index: int):
+        """Free a slot by moving the last live particle into it"""
+        last = self.count - 1
+
+        if index != last:
+            self.x[index] = self.x[last]
+            self.y[index] = self.y[last]
+            self.frame[index] = self.frame[last]
+            self.animation[index] = self.animation[last]
+            self.attack[index] = self.attack[last]
+            self.born[index] = self.born[last]
+
+        self.count = last
 
     def update(self):
-        self.animate()
+        """Advance every particle, dropping the finished ones"""
+        frame = self.frame
+        animation = self.animation
+        lengths = self.lengths
+        speed = self.animation_speed
+
+        index = 0
+        while index < self.count:
+            frame[index] += speed
+
+            if frame[index] >= lengths[animation[index]]:
+                # The last particle moves here and still has to be updated
+                self.remove(index)
+            else:
+                index += 1
+
+    def draw(self, surface: pygame.Surface, offset: pygame.math.Vector2):
+        """Blit every particle in one pass, on top of the world"""
+        offset_x = int(offset.x)
+        offset_y = int(offset.y)
+        x, y, frame, animation = self.x, self.y, self.frame, self.animation
+        animations = self.animations
+
+        surface.blits([
+            (animations[animation[index]][int(frame[index])],
+             (x[index] - offset_x, y[index] - offset_y))
+            for index in range(self.count)
+        ], False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'capacity': self.capacity,
+            'in_use': self.count,
+            'high_water': self.high_water,
+            'emitted': self.emitted,
+            'replaced': self.replaced
+        }
+
+    def attack_rects(self) -> List[pygame.Rect]:
+        """Rects of the live attack particles (flames)"""
+        sizes = self.sizes
+
+        return [
+            pygame.Rect((self.x[index], self.y[index]),
+                        sizes[self.animation[index]])
+            for index in range(self.count) if self.attack[index]
+        ]
@@ -3,7 +3,11 @@ from typing import *
 import pygame
 from entity import Entity
 
+from assets import assets
+from runtime import get_pressed, get_ticks
 from settings import *
+from sound import sounds
+from spatial import ObstacleGroup
 from support import import_folder
 from tile import Tile
 
@@ -11,14 +15,13 @@ from tile import Tile
 class Player(Entity):
     """Handle player movement, inputs, collisions, hitboxes, etc."""
 
-    def __init__(self, pos: Tuple[int, int], obstacle_sprites: pygame.sprite.Group, create_attack: Callable[[], None], create_magic: Callable[[], None], destroy_attack: Callable[[], None], *groups: pygame.sprite.AbstractGroup) -> None:
+    def __init__(self, pos: Tuple[int, int], obstacle_sprites: ObstacleGroup, create_attack: Callable[[], None], create_magic: Callable[[], None], destroy_attack: Callable[[], None], *groups: pygame.sprite.AbstractGroup) -> None:
         super().__init__(*groups)
 
         # Graphics setup
         self.import_player_assets()
         self.status = 'down'
-        self.image = pygame.image.load(
-            'graphics/test/player.png').convert_alpha()
+        self.image = assets.image('graphics/test/player.png')
         self.rect = self.image.get_rect(topleft=pos)
 
         # Hitbox and obstacles
@@ -39,8 +42,7 @@ class Player(Entity):
         self.weapon_index = 0
         self.weapon = list(weapon_data.keys())[self.weapon_index]
 
-        self.weapon_attack_sound = pygame.mixer.Sound('audio/sword.wav')
-        self.weapon_attack_sound.set_volume(0.4)
+        self.weapon_attack_sound = assets.sound('audio/sword.wav', 0.4)
 
         # Magic
         self.create_magic = create_magic
@@ -78,6 +80,8 @@ class Player(Entity):
             full_path = character_path + animation
             self.animations[animation] = import_folder(full_path)
 
+        self.prepare_flash(self.animations)
+
     def movementInput(self, keys: Sequence[bool]):
         if keys[pygame.K_UP]:
             self.direction.y = -1
@@ -99,21 +103,21 @@ class Player(Entity):
 
     def input(self):
         """Handle player inputs"""
-        keys = pygame.key.get_pressed()
+        keys = get_pressed()
 
         self.movementInput(keys)
 
         # Attack
         if keys[pygame.K_SPACE] and not self.attacking:
             self.attacking = True
-            self.attack_time = pygame.time.get_ticks()
+            self.attack_time = get_ticks()
             self.create_attack()
-            self.weapon_attack_sound.play()
+            sounds.play(self.weapon_attack_sound, 'player')
 
         # Magic
         if keys[pygame.K_LCTRL] and not self.attacking:
             self.attacking = True
-            self.attack_time = pygame.time.get_ticks()
+            self.attack_time = get_ticks()
 
             style = list(magic_data.keys())[self.magic_index]
             strength = list(magic_data.values())[
@@ -125,7 +129,7 @@ class Player(Entity):
         # Switch weapon
         if keys[pygame.K_q] and self.can_switch_weapon:
             self.can_switch_weapon = False
-            self.switch_weapon_time = pygame.time.get_ticks()
+            self.switch_weapon_time = get_ticks()
 
             if self.weapon_index < len(list(weapon_data.keys())) - 1:
                 self.weapon_index += 1
@@ -136,7 +140,7 @@ class Player(Entity):
         # Switch magic
         if keys[pygame.K_e] and self.can_switch_magic:
             self.can_switch_magic = False
-            self.magic_switch_time = pygame.time.get_ticks()
+            self.magic_switch_time = get_ticks()
 
             if self.magic_index < len(list(magic_data.keys())) - 1:
                 self.magic_index += 1
@@ -174,7 +178,7 @@ class Player(Entity):
 
     def cooldowns(self):
         """Handle cooldowns"""
-        current_time = pygame.time.get_ticks()
+        current_time = get_ticks()
 
         if self.attacking and current_time - self.attack_time >= self.attack_cooldown + weapon_data[self.weapon]['cooldown']:
             self.attacking = False
@@ -198,15 +202,9 @@ class Player(Entity):
         if self.frame_index >= len(animation):
             self.frame_index = 0
 
-        self.image = animation[int(self.frame_index)]
+        self.image = self.flash(animation[int(self.frame_index)])
         self.rect = self.image.get_rect(center=self.hitbox.center)
 
-        if not self.vulnerable:
-            alpha = self.wave_value()
-            self.image.set_alpha(alpha)
-        else:
-            self.image.set_alpha(255)
-
     def get_full_weapon_damage(self) -> int:
         """Sum base damage and weapon damage"""
         base_damage = self.stats['attack']
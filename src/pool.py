@@ -0,0 +1,50 @@
+from typing import *
+import pygame
+
+
+class SpritePool:
+    """Reuse short-lived sprites instead of building and killing new ones
+
+    Pooled sprites are built by the factory without arguments and must have a
+    reset(*args) method that puts them back in their just-created state.
+    acquire() resets a sprite and adds it to the pool's groups, release()
+    takes it out of every group and keeps it for the next acquire().
+    """
+
+    def __init__(self, factory: Callable[[], pygame.sprite.Sprite], *groups: pygame.sprite.AbstractGroup) -> None:
+        self.factory = factory
+        self.groups = groups
+
+        self.free: List[pygame.sprite.Sprite] = []
+        self.created = 0
+        self.in_use = 0
+        self.high_water = 0
+
+    def acquire(self, *args) -> pygame.sprite.Sprite:
+        if self.free:
+            sprite = self.free.pop()
+        else:
+            sprite = self.factory()
+            self.created += 1
+
+        # Reset first, spatial groups need the final rect when the sprite joins
+        sprite.reset(*args)
+        sprite.add(*self.groups)
+
+        self.in_use += 1
+        self.high_water = max(self.high_water, self.in_use)
+
+        return sprite
+
+    def release(self, sprite: pygame.sprite.Sprite):
+        sprite.kill()
+        self.free.append(sprite)
+        self.in_use -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'created': self.created,
+            'in_use': self.in_use,
+            'free': len(self.free),
+            'high_water': self.high_water
+        }
@@ -0,0 +1,89 @@
+from collections import defaultdict, deque
+from os import environ
+from time import perf_counter
+from typing import *
+import pygame
+
+from debug import debug, debug_graph
+from settings import FPS
+
+# Phases in the order they happen during a frame
+PHASES = ('events', 'floor', 'sort', 'sprites', 'ui',
+          'update', 'enemies', 'attack', 'flip')
+
+
+class FrameProfiler:
+    """Opt-in per-phase frame timer with rolling averages and p95/p99
+
+    Call sites guard every lap with `if profiler.enabled`, so a disabled profiler
+    costs one attribute check per phase and nothing else.
+    """
+
+    def __init__(self, history: int = 240) -> None:
+        self.enabled = environ.get('ZELDA_PROFILE') == '1'
+        self.history = history
+
+        self.samples: Dict[str, Deque[float]] = {
+            phase: deque(maxlen=history) for phase in PHASES + ('frame',)
+        }
+        self.current: Dict[str, float] = defaultdict(float)
+        self.frame_start = 0.0
+        self.last_lap = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+
+        for samples in self.samples.values():
+            samples.clear()
+
+        # Turned on mid-frame, so this frame starts now
+        self.begin()
+
+    def begin(self):
+        """Start timing a frame"""
+        self.frame_start = self.last_lap = perf_counter()
+        self.current.clear()
+
+    def lap(self, phase: str):
+        """Charge the time since the previous lap to phase"""
+        now = perf_counter()
+        self.current[phase] += now - self.last_lap
+        self.last_lap = now
+
+    def end(self):
+        """Store the finished frame in the rolling history"""
+        for phase in PHASES:
+            self.samples[phase].append(self.current[phase] * 1000)
+
+        self.samples['frame'].append((self.last_lap - self.frame_start) * 1000)
+
+    def stats(self, phase: str) -> Tuple[float, float, float]:
+        """Get (average, p95, p99) in ms for a phase"""
+        samples = self.samples[phase]
+
+        if not samples:
+            return (0.0, 0.0, 0.0)
+
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+
+        return (sum(ordered) / len(ordered),
+                ordered[int(last * .95)],
+                ordered[int(last * .99)])
+
+    def draw(self):
+        """Draw the phase table and the frame time graph with the debug helpers"""
+        y = 80
+        debug(f'{"ms":<8}{"avg":>6}{"p95":>6}{"p99":>6}', y, 10)
+        y += 22
+
+        for phase in PHASES + ('frame',):
+            average, p95, p99 = self.stats(phase)
+            debug(f'{phase:<8}{average:6.2f}{p95:6.2f}{p99:6.2f}', y, 10)
+            y += 22
+
+        debug_graph(self.samples['frame'], 1000 / FPS,
+                    pygame.Rect(10, y + 4, 240, 60))
+
+
+profiler = FrameProfiler()
@@ -0,0 +1,141 @@
+from array import array
+from hashlib import sha1
+from struct import Struct, error as StructError
+from typing import *
+from zlib import crc32
+import pygame
+
+from map_cache import MAP_SOURCES, little_endian
+from runtime import rng
+from settings import *
+
+# Every key the simulation reads, one bit each. K_m is the menu toggle, set on
+# the step it toggles (never on two steps in a row, toggles happen on its edge)
+RECORD_KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE,
+               pygame.K_LCTRL, pygame.K_q, pygame.K_e, pygame.K_m)
+
+MAGIC = b'ZRPL'
+VERSION = 1
+HEADER = Struct('<4sHQdII20sI')  # magic, version, seed, step ms, steps, runs, map signature, checksum
+
+
+class Recording:
+    """Everything a run depends on: the RNG seed, the step length and the keys of every step
+
+    Keys are stored as one bitmask per step (see RECORD_KEYS), run length
+    encoded in the file, so a 10 minute session is a few KB.
+    """
+
+    def __init__(self, seed: int, step_ms: float = 1000 / FPS, masks: Optional[List[int]] = None, signature: bytes = bytes(20), checksum: int = 0) -> None:
+        self.seed = seed
+        self.step_ms = step_ms
+        self.masks = masks if masks is not None else []
+        self.signature = signature
+        self.checksum = checksum
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def record(self, pressed: Iterable[int]):
+        """Append one step's pressed keys"""
+        mask = 0
+
+        for key in pressed:
+            mask |= 1 << RECORD_KEYS.index(key)
+
+        self.masks.append(mask)
+
+    def keys(self, frame: int) -> List[int]:
+        """Get the keys pressed on a step (nothing after the end), usable as a headless script"""
+        if frame >= len(self.masks):
+            return []
+
+        mask = self.masks[frame]
+
+        return [key for bit, key in enumerate(RECORD_KEYS) if mask >> bit & 1]
+
+    def save(self, path: str):
+        masks = array('H')
+        lengths = array('I')
+
+        for mask in self.masks:
+            if masks and masks[-1] == mask:
+                lengths[-1] += 1
+            else:
+                masks.append(mask)
+                lengths.append(1)
+
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.seed, self.step_ms, len(self.masks),
+                                   len(masks), self.signature, self.checksum))
+            file.write(little_endian(masks).tobytes())
+            file.write(little_endian(lengths).tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        try:
+            magic, version, seed, step_ms, steps, runs, signature, checksum = HEADER.unpack_from(data)
+        except StructError:
+            raise ValueError(f'{path} is not a recording')
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} recording')
+
+        masks = array('H')
+        lengths = array('I')
+        offset = HEADER.size
+        masks.frombytes(data[offset:offset + runs * masks.itemsize])
+        offset += runs * masks.itemsize
+        lengths.frombytes(data[offset:offset + runs * lengths.itemsize])
+
+        if len(masks) != runs or len(lengths) != runs or sum(lengths) != steps:
+            raise ValueError(f'{path} is truncated')
+
+        expanded = []
+
+        for mask, length in zip(little_endian(masks), little_endian(lengths)):
+            expanded.extend([mask] * length)
+
+        return cls(seed, step_ms, expanded, signature, checksum)
+
+
+def map_signature(sources: Dict[str, str] = MAP_SOURCES) -> bytes:
+    """Hash of the map CSVs' contents, a replay only matches on the map it was recorded on
+
+    Unlike the map cache key this ignores mtimes, so a fresh clone of the
+    same map still matches.
+    """
+    digest = sha1()
+
+    for style, source in sorted(sources.items()):
+        with open(source, 'rb') as file:
+            data = file.read()
+
+        digest.update(f'{style}:{len(data)};'.encode())
+        digest.update(data)
+
+    return digest.digest()
+
+
+def state_checksum(level) -> int:
+    """CRC of the simulation state (player, every enemy, standing tiles, the RNG), equal runs give equal values"""
+    player = level.player
+    enemies = list(level.enemy_sprites) + list(level.enemy_sprites.sleeping)
+    streamer = level.streamer
+    saved = sorted((region, tuple(states))
+                   for region, states in streamer.enemy_states.items())
+    standing = sorted(key for tiles in streamer.tiles.values()
+                      for key, tile in tiles if tile.alive())
+
+    state = (
+        tuple(player.hitbox), player.status, player.health, player.energy, player.exp,
+        tuple(player.stats.values()), player.weapon_index, player.magic_index,
+        [(enemy.monster_name, tuple(enemy.hitbox), enemy.health, enemy.status) for enemy in enemies],
+        saved, standing, sorted(streamer.destroyed), level.game_paused,
+        rng.getstate()
+    )
+
+    return crc32(repr(state).encode())
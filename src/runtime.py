@@ -0,0 +1,68 @@
+from random import Random
+from typing import *
+import pygame
+
+from settings import FPS
+
+# Where the game reads the time and the keyboard from. Normal runs use pygame
+# directly, headless runs swap in a virtual clock and scripted keys.
+ticks_source: Callable[[], int] = pygame.time.get_ticks
+keys_source: Callable[[], Sequence[bool]] = pygame.key.get_pressed
+
+# Every gameplay random number comes from here, so a seed replays a run exactly
+rng = Random()
+
+
+def get_ticks() -> int:
+    """Milliseconds since the game started (pygame.time.get_ticks or a virtual clock)"""
+    return ticks_source()
+
+
+def get_pressed() -> Sequence[bool]:
+    """Currently pressed keys (pygame.key.get_pressed or a scripted KeyState)"""
+    return keys_source()
+
+
+def set_ticks_source(source: Callable[[], int]):
+    global ticks_source
+    ticks_source = source
+
+
+def set_keys_source(source: Callable[[], Sequence[bool]]):
+    global keys_source
+    keys_source = source
+
+
+def seed(value: int):
+    """Restart the gameplay random stream"""
+    rng.seed(value)
+
+
+def reset_sources():
+    """Go back to the real clock and keyboard"""
+    set_ticks_source(pygame.time.get_ticks)
+    set_keys_source(pygame.key.get_pressed)
+
+
+class VirtualClock:
+    """Clock that only moves when told to, one fixed step per simulated frame"""
+
+    def __init__(self, step_ms: float = 1000 / FPS) -> None:
+        self.step_ms = step_ms
+        self.time = 0.0
+
+    def advance(self, steps: int = 1):
+        self.time += self.step_ms * steps
+
+    def get_ticks(self) -> int:
+        return int(self.time)
+
+
+class KeyState:
+    """Stand-in for pygame.key.get_pressed() built from a set of pressed keys"""
+
+    def __init__(self, pressed: Iterable[int] = ()) -> None:
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key: int) -> bool:
+        return key in self.pressed
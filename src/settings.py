@@ -3,9 +3,55 @@ WIDTH = 1280
 HEIGTH = 720
 # WIDTH = 800
 # HEIGTH = 600
+# Simulation steps per second (everything that moves is measured per step)
 FPS = 60
+# Frames drawn per second at most (30 on weak machines doesn't change gameplay)
+RENDER_FPS = FPS
+# Update steps run before a frame has to be drawn, past this the game slows down
+MAX_FRAME_SKIP = 5
+# Tick rate while the upgrade menu is open and nothing changes
+PAUSED_FPS = 20
 TILESIZE = 64
 
+# Extra pixels around the screen that still count as visible when culling
+CAMERA_CULL_MARGIN = TILESIZE
+
+# Floor chunks (pixels), chunks further than the keep margin from the screen are evicted
+FLOOR_CHUNK_SIZE = 512
+FLOOR_KEEP_MARGIN = FLOOR_CHUNK_SIZE
+
+# Enemies further than this outside the screen sleep (no animation, movement or AI).
+# Keep it big enough that every notice_radius around the player stays awake.
+ENEMY_ACTIVE_MARGIN = TILESIZE * 4
+
+# Tiles around the player covered by the enemies' flow field (more than the
+# biggest notice radius, so paths can go around walls)
+FLOW_FIELD_RADIUS = 12
+
+# Map streaming: regions are REGION_SIZE tiles wide, loaded within the load
+# margin of the screen (past the enemy sleep distance) and released past the
+# unload margin
+REGION_SIZE = 16
+STREAM_LOAD_MARGIN = TILESIZE * 8
+STREAM_UNLOAD_MARGIN = STREAM_LOAD_MARGIN + TILESIZE * 4
+
+# Sound effects share SOUND_CHANNELS mixer channels. Category -> (max voices,
+# priority), higher priority voices are stolen last. Sources further than the
+# margin off screen aren't played
+SOUND_CHANNELS = 8
+SOUND_CATEGORIES = {
+    'player': (2, 3),
+    'magic': (2, 3),
+    'hit': (3, 2),
+    'death': (2, 2),
+    'attack': (3, 1)
+}
+SOUND_MARGIN = TILESIZE
+
+# Entity layer values
+PLAYER_SPAWN = 394
+MONSTER_SPAWNS = {390: 'bamboo', 391: 'spirit', 392: 'raccoon', 393: 'squid'}
+
 HITBOX_OFFSET = {
     'player': -26,
     'object': -40,
@@ -51,6 +97,9 @@ magic_data = {
     'heal': {'strength': 20, 'cost': 10, 'graphic': 'graphics/particles/heal/heal.png'}
 }
 
+# Particles (the oldest live particle is replaced when all slots are taken)
+PARTICLE_CAPACITY = 256
+
 # Enemies
 monster_data = {
     'squid': {'health': 100, 'exp': 100, 'damage': 20, 'attack_type': 'slash', 'attack_sound': 'audio/attack/slash.wav', 'speed': 3, 'resistance': 3, 'attack_radius': 80, 'notice_radius': 360},
@@ -0,0 +1,133 @@
+from math import hypot
+from typing import *
+import pygame
+
+from settings import *
+
+
+class Voice(NamedTuple):
+    """A sound playing on one of the manager's channels"""
+    sound: pygame.mixer.Sound
+    category: str
+    priority: int
+    distance: float
+
+
+class SoundManager:
+    """Plays every sound effect through a fixed channel budget
+
+    Each category (see SOUND_CATEGORIES) gets a voice cap and a priority. A
+    sound over its category's cap replaces the farthest voice of that
+    category, and when every channel is busy the lowest priority (then
+    farthest) voice is stolen. Sounds whose source is off screen are skipped.
+    Music is streamed from disk with pygame.mixer.music.
+    """
+
+    def __init__(self, channels: int = SOUND_CHANNELS, categories: Dict[str, Tuple[int, int]] = SOUND_CATEGORIES, margin: int = SOUND_MARGIN) -> None:
+        self.categories = categories
+        self.channel_count = channels
+
+        # Channels are reserved on the first play, the mixer isn't ready at import
+        self.channels: List[pygame.mixer.Channel] = []
+        self.voices: Dict[int, Voice] = {}
+
+        self.listener = (0, 0)
+        self.margin = margin
+        self.audible_rect: Optional[pygame.Rect] = None
+
+        self.played = 0
+        self.skipped = 0
+        self.stolen = 0
+        self.dropped = 0
+
+    def setup(self) -> bool:
+        """Reserve the channels, False if there is no mixer"""
+        if not pygame.mixer.get_init():
+            return False
+
+        if not self.channels:
+            pygame.mixer.set_num_channels(self.channel_count)
+            self.channels = [pygame.mixer.Channel(index)
+                             for index in range(self.channel_count)]
+
+        return True
+
+    def set_listener(self, pos: Tuple[int, int]):
+        """Move the ear (the camera center) sources are measured from"""
+        self.listener = pos
+
+        if self.audible_rect is None:
+            self.audible_rect = pygame.display.get_surface().get_rect().inflate(
+                self.margin * 2, self.margin * 2)
+
+        self.audible_rect.center = pos
+
+    def play(self, sound: pygame.mixer.Sound, category: str, pos: Optional[Tuple[int, int]] = None):
+        """Play a sound effect, pos is its world position (None for sounds heard anywhere)"""
+        if pos is not None and self.audible_rect and not self.audible_rect.collidepoint(pos):
+            self.skipped += 1
+            return
+
+        if not self.setup():
+            return
+
+        cap, priority = self.categories[category]
+        distance = 0.0 if pos is None else hypot(
+            pos[0] - self.listener[0], pos[1] - self.listener[1])
+
+        # Forget the voices that finished
+        for index in [index for index in self.voices if not self.channels[index].get_busy()]:
+            del self.voices[index]
+
+        same_category = [index for index, voice in self.voices.items()
+                         if voice.category == category]
+
+        if len(same_category) >= cap:
+            index = max(same_category, key=lambda index: self.voices[index].distance)
+            victim = self.voices[index]
+        else:
+            index = next((index for index in range(self.channel_count)
+                          if index not in self.voices), None)
+            victim = None
+
+            if index is None:
+                index = min(self.voices, key=lambda index: (
+                    self.voices[index].priority, -self.voices[index].distance))
+                victim = self.voices[index]
+
+                if victim.priority > priority:
+                    self.dropped += 1
+                    return
+
+        # A voice is only replaced by one at least as close
+        if victim is not None:
+            if victim.priority == priority and victim.distance < distance:
+                self.dropped += 1
+                return
+
+            self.stolen += 1
+
+        self.channels[index].play(sound)
+        self.voices[index] = Voice(sound, category, priority, distance)
+        self.played += 1
+
+    def play_music(self, path: str, volume: float = 1.0, loops: int = -1):
+        """Stream a music file instead of decoding it all into a Sound"""
+        if not pygame.mixer.get_init():
+            return
+
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'voices': len(self.voices),
+            'played': self.played,
+            'skipped': self.skipped,
+            'stolen': self.stolen,
+            'dropped': self.dropped
+        }
+
+
+sounds = SoundManager()
@@ -0,0 +1,173 @@
+from typing import *
+import pygame
+
+from settings import *
+
+
+class SpatialGridGroup(pygame.sprite.Group):
+    """Sprite group that also buckets its sprites on a uniform grid for fast area queries"""
+
+    def __init__(self, *sprites: Union[pygame.sprite.Sprite, Sequence[pygame.sprite.Sprite]], cell_size: int = TILESIZE, rect_attr: str = 'hitbox') -> None:
+        self.cell_size = cell_size
+        self.rect_attr = rect_attr
+
+        self.cells: Dict[Tuple[int, int], List[pygame.sprite.Sprite]] = {}
+        self.sprite_cells: Dict[pygame.sprite.Sprite, Tuple[int, int, int, int]] = {}
+
+        super().__init__(*sprites)
+
+    def cell_range(self, rect: pygame.Rect) -> Tuple[int, int, int, int]:
+        """Get the (left, top, right, bottom) cell indexes covered by a rect (inclusive)"""
+        size = self.cell_size
+
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None):
+        super().add_internal(sprite)
+
+        cells = self.cell_range(getattr(sprite, self.rect_attr))
+        self.sprite_cells[sprite] = cells
+        self.insert_cells(sprite, cells)
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite):
+        super().remove_internal(sprite)
+
+        cells = self.sprite_cells.pop(sprite, None)
+        if cells:
+            self.remove_cells(sprite, cells)
+
+    def insert_cells(self, sprite: pygame.sprite.Sprite, cells: Tuple[int, int, int, int]):
+        left, top, right, bottom = cells
+
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                self.cells.setdefault((col, row), []).append(sprite)
+
+    def remove_cells(self, sprite: pygame.sprite.Sprite, cells: Tuple[int, int, int, int]):
+        left, top, right, bottom = cells
+
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                bucket = self.cells[(col, row)]
+                bucket.remove(sprite)
+
+                if not bucket:
+                    del self.cells[(col, row)]
+
+    def refresh(self, sprites: Iterable[pygame.sprite.Sprite]):
+        """Move sprites of this group that moved to their new cells"""
+        sprite_cells = self.sprite_cells
+
+        for sprite in sprites:
+            old_cells = sprite_cells.get(sprite)
+
+            if old_cells is None:
+                continue
+
+            cells = self.cell_range(getattr(sprite, self.rect_attr))
+
+            if cells != old_cells:
+                self.remove_cells(sprite, old_cells)
+                self.insert_cells(sprite, cells)
+                sprite_cells[sprite] = cells
+
+    def query(self, rect: pygame.Rect) -> List[pygame.sprite.Sprite]:
+        """Get the sprites whose cells overlap the rect (candidates, not exact hits)"""
+        left, top, right, bottom = self.cell_range(rect)
+        cells = self.cells
+
+        if left == right and top == bottom:
+            return list(cells.get((left, top), ()))
+
+        found = []
+        seen = set()
+
+        for row in range(top, bottom + 1):
+            for col in range(left, right + 1):
+                bucket = cells.get((col, row))
+
+                if bucket:
+                    for sprite in bucket:
+                        if sprite not in seen:
+                            seen.add(sprite)
+                            found.append(sprite)
+
+        return found
+
+
+class ObstacleGroup(SpatialGridGroup):
+    """Obstacle sprites plus an occupancy bitmap for the static walls
+
+    Walls cost one byte per cell instead of a sprite each, and resolving a move
+    against them only looks at the cells the hitbox sweeps through. version
+    goes up on every change, so anything built from the obstacles (the flow
+    field) can tell it is stale.
+    """
+
+    def __init__(self, width: int, height: int, *sprites: Union[pygame.sprite.Sprite, Sequence[pygame.sprite.Sprite]], cell_size: int = TILESIZE) -> None:
+        self.width = width
+        self.height = height
+        self.solid = bytearray(width * height)
+        self.version = 0
+
+        super().__init__(*sprites, cell_size=cell_size)
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None):
+        super().add_internal(sprite)
+        self.version += 1
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite):
+        super().remove_internal(sprite)
+        self.version += 1
+
+    def set_solid(self, col: int, row: int, solid: bool = True):
+        self.solid[row * self.width + col] = solid
+        self.version += 1
+
+    def is_solid(self, col: int, row: int) -> bool:
+        """Check a cell, everything outside the map is open"""
+        if 0 <= col < self.width and 0 <= row < self.height:
+            return self.solid[row * self.width + col] != 0
+
+        return False
+
+    def solid_column(self, col: int, top: int, bottom: int) -> bool:
+        return any(self.is_solid(col, row) for row in range(top, bottom + 1))
+
+    def solid_row(self, row: int, left: int, right: int) -> bool:
+        return any(self.is_solid(col, row) for col in range(left, right + 1))
+
+    def resolve_walls(self, hitbox: pygame.Rect, direction: Literal['horizontal', 'vertical'], sign: float, start: int):
+        """Push hitbox out of the walls after it moved along one axis from start (its old x or y)"""
+        size = self.cell_size
+
+        if direction == 'horizontal':
+            top = hitbox.top // size
+            bottom = (hitbox.bottom - 1) // size
+
+            if sign > 0:
+                for col in range((start + hitbox.width - 1) // size, (hitbox.right - 1) // size + 1):
+                    if self.solid_column(col, top, bottom):
+                        hitbox.right = col * size
+                        break
+            elif sign < 0:
+                for col in range(start // size, hitbox.left // size - 1, -1):
+                    if self.solid_column(col, top, bottom):
+                        hitbox.left = (col + 1) * size
+                        break
+
+        if direction == 'vertical':
+            left = hitbox.left // size
+            right = (hitbox.right - 1) // size
+
+            if sign > 0:
+                for row in range((start + hitbox.height - 1) // size, (hitbox.bottom - 1) // size + 1):
+                    if self.solid_row(row, left, right):
+                        hitbox.bottom = row * size
+                        break
+            elif sign < 0:
+                for row in range(start // size, hitbox.top // size - 1, -1):
+                    if self.solid_row(row, left, right):
+                        hitbox.top = (row + 1) * size
+                        break
@@ -0,0 +1,155 @@
+from typing import *
+import pygame
+
+from map_cache import MapData
+from settings import *
+
+
+class EnemyState(NamedTuple):
+    """What is kept of an enemy while its region is unloaded"""
+    monster_name: str
+    pos: Tuple[int, int]  # spawn topleft, or the saved hitbox topleft
+    health: Optional[float] = None  # None for an enemy that never spawned
+
+
+class RegionStreamer:
+    """Create the map's tiles and enemies region by region around the camera
+
+    The map is split into REGION_SIZE x REGION_SIZE tile regions. A region's
+    sprites are created when it comes within load_margin of the screen and
+    released once it is further than unload_margin, so the live sprite count
+    depends on the screen size instead of the map size. Released enemies keep
+    their position and health, and cut grass stays cut.
+    """
+
+    def __init__(self, map_data: MapData, create_tile: Callable[[str, int, int, int], pygame.sprite.Sprite], create_enemy: Callable[[str, Tuple[int, int]], pygame.sprite.Sprite], region_size: int = REGION_SIZE, load_margin: int = STREAM_LOAD_MARGIN, unload_margin: int = STREAM_UNLOAD_MARGIN) -> None:
+        self.map_data = map_data
+        self.create_tile = create_tile
+        self.create_enemy = create_enemy
+
+        self.region_size = region_size
+        self.region_pixels = region_size * TILESIZE
+        self.columns = -(-map_data.width // region_size)
+        self.rows = -(-map_data.height // region_size)
+
+        display_size = pygame.display.get_surface().get_size()
+        self.load_rect = pygame.Rect((0, 0), display_size).inflate(
+            load_margin * 2, load_margin * 2)
+        self.unload_rect = pygame.Rect((0, 0), display_size).inflate(
+            unload_margin * 2, unload_margin * 2)
+
+        # Enemies of the regions that aren't loaded (all of them at first)
+        self.enemy_states: Dict[Tuple[int, int], List[EnemyState]] = {}
+
+        for value, col, row in map_data.spawns:
+            if value != PLAYER_SPAWN:
+                self.enemy_states.setdefault(self.region_of(col, row), []).append(
+                    EnemyState(MONSTER_SPAWNS.get(value, 'squid'), (col * TILESIZE, row * TILESIZE)))
+
+        # (style, col, row) of tiles destroyed while their region was loaded
+        self.destroyed: Set[Tuple[str, int, int]] = set()
+
+        self.tiles: Dict[Tuple[int, int], List[Tuple[Tuple[str, int, int], pygame.sprite.Sprite]]] = {}
+        self.enemies: Dict[Tuple[int, int], List[pygame.sprite.Sprite]] = {}
+
+        self.loads = 0
+        self.unloads = 0
+
+    def region_of(self, col: int, row: int) -> Tuple[int, int]:
+        """Get the region holding a tile"""
+        return (col // self.region_size, row // self.region_size)
+
+    def region_rect(self, region: Tuple[int, int]) -> pygame.Rect:
+        size = self.region_pixels
+        return pygame.Rect(region[0] * size, region[1] * size, size, size)
+
+    def regions_in(self, rect: pygame.Rect) -> Iterator[Tuple[int, int]]:
+        """Yield the regions (inside the map) a pixel rect meets"""
+        size = self.region_pixels
+
+        for row in range(max(rect.top // size, 0), min((rect.bottom - 1) // size, self.rows - 1) + 1):
+            for col in range(max(rect.left // size, 0), min((rect.right - 1) // size, self.columns - 1) + 1):
+                yield (col, row)
+
+    def load(self, region: Tuple[int, int]):
+        """Create a region's tiles and restore its enemies"""
+        size = self.region_size
+        left, top = region[0] * size, region[1] * size
+        right = min(left + size, self.map_data.width) - 1
+        bottom = min(top + size, self.map_data.height) - 1
+
+        tiles = []
+
+        for style in ('grass', 'object'):
+            for value, col, row in self.map_data.tiles_in(style, left, top, right, bottom):
+                key = (style, col, row)
+
+                if key not in self.destroyed:
+                    tiles.append((key, self.create_tile(style, value, col, row)))
+
+        enemies = []
+
+        for state in self.enemy_states.pop(region, ()):
+            enemy = self.create_enemy(state.monster_name, state.pos)
+
+            if state.health is not None:
+                enemy.health = state.health
+                enemy.hitbox.topleft = state.pos
+                enemy.rect.center = enemy.hitbox.center
+
+            enemies.append(enemy)
+
+        self.tiles[region] = tiles
+        self.enemies[region] = enemies
+        self.loads += 1
+
+    def unload(self, region: Tuple[int, int]):
+        """Release a region's sprites, saving what changed"""
+        for key, tile in self.tiles.pop(region):
+            if tile.alive():
+                tile.kill()
+            else:
+                self.destroyed.add(key)
+
+        for enemy in self.enemies.pop(region):
+            # Dead enemies stay dead
+            if not enemy.alive():
+                continue
+
+            # Enemies belong to the region they walked to
+            col, row = enemy.hitbox.centerx // TILESIZE, enemy.hitbox.centery // TILESIZE
+            owner = self.region_of(col, row)
+
+            if owner != region and owner in self.enemies:
+                self.enemies[owner].append(enemy)
+            else:
+                self.enemy_states.setdefault(owner, []).append(
+                    EnemyState(enemy.monster_name, enemy.hitbox.topleft, enemy.health))
+                enemy.kill()
+
+        self.unloads += 1
+
+    def update(self, center: Tuple[int, int]):
+        """Load the regions near the camera and release the far ones"""
+        self.load_rect.center = center
+        self.unload_rect.center = center
+
+        for region in self.regions_in(self.load_rect):
+            if region not in self.tiles:
+                self.load(region)
+
+        far_regions = [
+            region for region in self.tiles if not self.unload_rect.colliderect(self.region_rect(region))
+        ]
+
+        for region in far_regions:
+            self.unload(region)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'regions': self.columns * self.rows,
+            'loaded': len(self.tiles),
+            'loads': self.loads,
+            'unloads': self.unloads,
+            'saved_enemies': sum(len(states) for states in self.enemy_states.values())
+        }
@@ -1,9 +1,10 @@
 from csv import reader
-from os import walk
 from typing import List
 
 import pygame
 
+from assets import assets
+
 
 def import_csv_layout(path: str) -> List[str]:
     """Import a CSV file"""
@@ -19,13 +20,5 @@ def import_csv_layout(path: str) -> List[str]:
 
 
 def import_folder(path: str) -> List[pygame.Surface]:
-    """Take all images from a folder"""
-    surface_list = []
-
-    for _, __, image_files in walk(path):
-        for img in image_files:
-            full_path = path + '/' + img
-            image_surface = pygame.image.load(full_path).convert_alpha()
-            surface_list.append(image_surface)
-
-    return surface_list
+    """Take all images from a folder (shared through the asset registry)"""
+    return assets.folder(path)
@@ -8,7 +8,7 @@ class Tile(pygame.sprite.Sprite):
     """Represents a tile in the game"""
 
     def __init__(self, pos: Tuple[int, int], sprite_type: Literal['grass', 'invisible', 'object'], *groups: pygame.sprite.AbstractGroup, surface=pygame.Surface((TILESIZE, TILESIZE))) -> None:
-        super().__init__(*groups)
+        super().__init__()
 
         self.sprite_type = sprite_type
         self.image = surface
@@ -20,3 +20,6 @@ class Tile(pygame.sprite.Sprite):
         else:
             self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(0, y_offset)
+
+        # Join the groups only once the hitbox exists (spatial groups index it)
+        self.add(*groups)
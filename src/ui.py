@@ -1,5 +1,6 @@
-from typing import List
+from typing import Callable, Dict, Hashable, List, Tuple
 import pygame
+from assets import assets
 from player import Player
 from settings import *
 
@@ -22,77 +23,105 @@ class UI:
 
         for weapon in weapon_data.values():
             path = weapon['graphic']
-            weapon = pygame.image.load(path).convert_alpha()
+            weapon = assets.image(path)
             self.weapon_graphics.append(weapon)
 
         for magic in magic_data.values():
             path = magic['graphic']
-            magic = pygame.image.load(path).convert_alpha()
+            magic = assets.image(path)
             self.magic_graphics.append(magic)
 
-    def show_bar(self, current: int, max_amount: int, bg_rect: pygame.Rect, color: str):
-        """Draw a bar on the UI"""
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, bg_rect)
+        # name -> (key, surface, rect), a widget is rendered again only when its key changes
+        self.widgets: Dict[str, Tuple[Hashable, pygame.Surface, pygame.Rect]] = {}
 
-        ratio = current / max_amount
-        current_width = bg_rect.width * ratio
+    def widget(self, name: str, key: Hashable, build: Callable[[], Tuple[pygame.Surface, pygame.Rect]]) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Get a cached widget surface, rebuilding it only when its key changed"""
+        cached = self.widgets.get(name)
 
-        current_rect = bg_rect.copy()
-        current_rect.width = current_width
+        if cached is None or cached[0] != key:
+            cached = (key, *build())
+            self.widgets[name] = cached
 
-        pygame.draw.rect(self.display_surface, color, current_rect)
-        pygame.draw.rect(self.display_surface,
-                         UI_BORDER_COLOR, bg_rect, 3)
+        return cached[1], cached[2]
 
-    def show_exp(self, exp: int):
-        """Draw EXP on the UI"""
+    def show_bar(self, current: int, max_amount: int, bg_rect: pygame.Rect, color: str) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Render a bar widget"""
+        surface = pygame.Surface(bg_rect.size).convert()
+        local_rect = surface.get_rect()
+        pygame.draw.rect(surface, UI_BG_COLOR, local_rect)
+
+        current_rect = local_rect.copy()
+        current_rect.width = self.bar_width(current, max_amount, bg_rect)
+
+        pygame.draw.rect(surface, color, current_rect)
+        pygame.draw.rect(surface, UI_BORDER_COLOR, local_rect, 3)
+
+        return surface, bg_rect
+
+    def bar_width(self, current: int, max_amount: int, bg_rect: pygame.Rect) -> int:
+        """Get the filled width in pixels, regeneration only redraws a bar when this changes"""
+        return round(bg_rect.width * current / max_amount)
+
+    def show_exp(self, exp: int) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Render the EXP widget"""
         text_surf = self.font.render(str(int(exp)), False, TEXT_COLOR)
         x = self.display_surface.get_size()[0] - 20
         y = self.display_surface.get_size()[1] - 20
         text_rect = text_surf.get_rect(bottomright=(x, y))
+        box_rect = text_rect.inflate(20, 20)
 
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR,
-                         text_rect.inflate(20, 20))
-        self.display_surface.blit(text_surf, text_rect)
-        pygame.draw.rect(self.display_surface, UI_BORDER_COLOR,
-                         text_rect.inflate(20, 20), 3)
+        surface = pygame.Surface(box_rect.size).convert()
+        local_rect = surface.get_rect()
+        pygame.draw.rect(surface, UI_BG_COLOR, local_rect)
+        surface.blit(text_surf, text_surf.get_rect(center=local_rect.center))
+        pygame.draw.rect(surface, UI_BORDER_COLOR, local_rect, 3)
 
-    def selection_box(self, left: int, top: int, has_switched: bool):
-        """Draw a box on the UI"""
+        return surface, box_rect
+
+    def selection_box(self, left: int, top: int, has_switched: bool, item_surf: pygame.Surface) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Render a box with an item in it"""
         bg_rect = pygame.Rect(left, top, ITEM_BOX_SIZE, ITEM_BOX_SIZE)
-        pygame.draw.rect(self.display_surface, UI_BG_COLOR, bg_rect)
+
+        surface = pygame.Surface(bg_rect.size).convert()
+        local_rect = surface.get_rect()
+        pygame.draw.rect(surface, UI_BG_COLOR, local_rect)
 
         if has_switched:
-            pygame.draw.rect(self.display_surface,
-                             UI_BORDER_COLOR_ACTIVE, bg_rect, 3)
+            pygame.draw.rect(surface, UI_BORDER_COLOR_ACTIVE, local_rect, 3)
         else:
-            pygame.draw.rect(self.display_surface, UI_BORDER_COLOR, bg_rect, 3)
-
-        return bg_rect
+            pygame.draw.rect(surface, UI_BORDER_COLOR, local_rect, 3)
 
-    def weapon_overlay(self, weapon_index: int, has_switched: bool):
-        """Create the weapon UI"""
-        bg_rect = self.selection_box(10, 630, has_switched)
-        weapon_surf = self.weapon_graphics[weapon_index]
-        weapon_rect = weapon_surf.get_rect(center=bg_rect.center)
+        surface.blit(item_surf, item_surf.get_rect(center=local_rect.center))
 
-        self.display_surface.blit(weapon_surf, weapon_rect)
+        return surface, bg_rect
 
-    def magic_overlay(self, magic_index: int, has_switched: bool):
-        """Create the magic UI"""
-        bg_rect = self.selection_box(80, 635, has_switched)
-        magic_surf = self.magic_graphics[magic_index]
-        magic_rect = magic_surf.get_rect(center=bg_rect.center)
+    def weapon_overlay(self, weapon_index: int, has_switched: bool) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Render the weapon widget"""
+        return self.selection_box(10, 630, has_switched, self.weapon_graphics[weapon_index])
 
-        self.display_surface.blit(magic_surf, magic_rect)
+    def magic_overlay(self, magic_index: int, has_switched: bool) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Render the magic widget"""
+        return self.selection_box(80, 635, has_switched, self.magic_graphics[magic_index])
 
     def display(self, player: Player):
-        self.show_bar(
-            player.health, player.stats['health'], self.health_bar_rect, HEALTH_COLOR)
-        self.show_bar(
-            player.energy, player.stats['energy'], self.energy_bar_rect, ENERGY_COLOR)
-
-        self.show_exp(player.exp)
-
-        self.weapon_overlay(player.weapon_index, not player.can_switch_weapon)
-        self.magic_overlay(player.magic_index, not player.can_switch_magic)
+        """Composite the cached widgets, rebuilding the ones whose inputs changed"""
+        health_max = player.stats['health']
+        energy_max = player.stats['energy']
+        health_width = self.bar_width(player.health, health_max, self.health_bar_rect)
+        energy_width = self.bar_width(player.energy, energy_max, self.energy_bar_rect)
+        weapon_switched = not player.can_switch_weapon
+        magic_switched = not player.can_switch_magic
+
+        widgets = (
+            self.widget('health', health_width, lambda: self.show_bar(
+                player.health, health_max, self.health_bar_rect, HEALTH_COLOR)),
+            self.widget('energy', energy_width, lambda: self.show_bar(
+                player.energy, energy_max, self.energy_bar_rect, ENERGY_COLOR)),
+            self.widget('exp', int(player.exp), lambda: self.show_exp(player.exp)),
+            self.widget('weapon', (player.weapon_index, weapon_switched), lambda: self.weapon_overlay(
+                player.weapon_index, weapon_switched)),
+            self.widget('magic', (player.magic_index, magic_switched), lambda: self.magic_overlay(
+                player.magic_index, magic_switched))
+        )
+
+        self.display_surface.blits(widgets, False)
@@ -1,6 +1,7 @@
-from typing import List
+from typing import Hashable, List
 import pygame
 from player import Player
+from runtime import get_pressed, get_ticks
 from settings import *
 
 
@@ -26,21 +27,21 @@ class Upgrade:
 
     def input(self):
         """Handle menu inputs"""
-        keys = pygame.key.get_pressed()
+        keys = get_pressed()
 
         if self.can_move:
             if keys[pygame.K_RIGHT] and self.selection_index < self.attribute_nr - 1:
                 self.selection_index += 1
                 self.can_move = False
-                self.selection_time = pygame.time.get_ticks()
+                self.selection_time = get_ticks()
             elif keys[pygame.K_LEFT] and self.selection_index >= 1:
                 self.selection_index -= 1
                 self.can_move = False
-                self.selection_time = pygame.time.get_ticks()
+                self.selection_time = get_ticks()
 
         if keys[pygame.K_SPACE]:
             self.can_move = False
-            self.selection_time = pygame.time.get_ticks()
+            self.selection_time = get_ticks()
             self.items[self.selection_index].trigger(self.player)
 
     def create_items(self):
@@ -61,15 +62,21 @@ class Upgrade:
     def cooldowns(self):
         """Handle menu cooldowns"""
         if not self.can_move:
-            current_time = pygame.time.get_ticks()
+            current_time = get_ticks()
 
             if current_time - self.selection_time >= 300:
                 self.can_move = True
 
-    def display(self):
+    def update(self):
         self.input()
         self.cooldowns()
 
+    def state(self) -> Hashable:
+        """Everything the menu shows, it only needs drawing again when this changes"""
+        return (self.selection_index, self.player.exp,
+                tuple(self.player.stats.values()), tuple(self.player.upgrade_cost.values()))
+
+    def display(self):
         for index, item in enumerate(self.items):
             name = self.attributes[index]
             value = self.player.get_value_by_index(index)
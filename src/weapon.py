@@ -1,20 +1,46 @@
+from typing import Dict, Optional
 import pygame
 
+from assets import assets
 from player import Player
+from settings import weapon_data
 
 
 class Weapon(pygame.sprite.Sprite):
     """Create a weapon on the scene"""
 
-    def __init__(self, player: Player, *groups: pygame.sprite.AbstractGroup) -> None:
-        super().__init__(*groups)
+    graphics: Dict[str, Dict[str, pygame.Surface]] = {}
+
+    @classmethod
+    def import_graphics(cls):
+        """Decode every weapon in every direction once, so attacking never touches the disk"""
+        if not cls.graphics:
+            cls.graphics = {
+                weapon: {
+                    direction: assets.image(
+                        f'graphics/weapons/{weapon}/{direction}.png')
+                    for direction in ('up', 'down', 'left', 'right')
+                }
+                for weapon in weapon_data.keys()
+            }
+
+    def __init__(self, player: Optional[Player] = None, *groups: pygame.sprite.AbstractGroup) -> None:
+        super().__init__()
 
         self.sprite_type = 'weapon'
+
+        # Pooled weapons are built empty and placed by reset() on every swing
+        if player:
+            self.reset(player)
+            self.add(*groups)
+
+    def reset(self, player: Player):
+        """Pick the graphic and placement for the player's weapon and facing"""
         direction = player.status.split('_')[0]
 
         # Graphic
-        full_path = f'graphics/weapons/{player.weapon}/{direction}.png'
-        self.image = pygame.image.load(full_path).convert_alpha()
+        self.import_graphics()
+        self.image = self.graphics[player.weapon][direction]
 
         # Placement
         if direction == 'right':